@@ -0,0 +1,182 @@
+"""
+Inference benchmark for the multi-output CNN.
+
+Loads the model exactly like inference.py, runs it on synthetic sensor
+windows (generated like generate_fake.py, no MQTT broker needed) and sweeps
+model variants, TFLite thread counts and batch sizes. Results are written as
+JSON so runs can be compared across model updates.
+
+    python3 benchmark.py --threads 1 2 4 --batch-sizes 1 8 32 --output bench.json
+"""
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import resource
+import sys
+import time
+
+import numpy as np
+
+from forecaster import (
+    MODEL_VARIANTS, forecast_columns, generate_fake_windows, interpreter_class,
+    load_interpreter, parse_horizon, predict, preprocess_sensor_data, select_horizon,
+)
+
+def peak_rss_mb():
+    # Highest RSS of the whole process so far (never goes down);
+    # ru_maxrss is in KB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def current_rss_mb():
+    # RSS right now, so each configuration's own footprint can be measured
+    # (Linux only: None where /proc is not available)
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return round(pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024), 1)
+
+def summarize(samples):
+    ms = np.asarray(samples) * 1000
+    return {
+        "p50_ms": round(float(np.percentile(ms, 50)), 4),
+        "p99_ms": round(float(np.percentile(ms, 99)), 4),
+        "mean_ms": round(float(ms.mean()), 4),
+    }
+
+def bench_invoke(interpreter, inputs, batch_size, iterations, warmup):
+    """
+    Times predict() (set_tensor + invoke + unnormalize) on batches of windows.
+    """
+    batch = np.concatenate([inputs[i % len(inputs)] for i in range(batch_size)])
+    for _ in range(warmup):
+        predict(interpreter, batch)
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        predict(interpreter, batch)
+        samples.append(time.perf_counter() - started)
+    result = summarize(samples)
+    result["windows_per_s"] = round(batch_size * iterations / sum(samples), 1)
+    return result
+
+def bench_end_to_end(interpreter, windows, iterations, warmup):
+    """
+    Times the full per-window path of inference.py with each stage measured
+    separately: preprocessing, model invoke, and forecast formatting.
+    """
+    stages = {"preprocess": [], "invoke": [], "postprocess": [], "total": []}
+    horizon = parse_horizon()
+    for i in range(warmup + iterations):
+        readings = windows[i % len(windows)]
+        t0 = time.perf_counter()
+        input_tensor = preprocess_sensor_data(readings)
+        t1 = time.perf_counter()
+        predictions = predict(interpreter, input_tensor)
+        t2 = time.perf_counter()
+        json.dumps(forecast_columns(select_horizon(predictions, horizon)[0], time.time(), horizon))
+        t3 = time.perf_counter()
+        if i < warmup:
+            continue
+        stages["preprocess"].append(t1 - t0)
+        stages["invoke"].append(t2 - t1)
+        stages["postprocess"].append(t3 - t2)
+        stages["total"].append(t3 - t0)
+    return {stage: summarize(samples) for stage, samples in stages.items()}
+
+def run(args):
+    windows = generate_fake_windows(args.windows)
+    inputs = [preprocess_sensor_data(window) for window in windows]
+    results = []
+    # Import the TFLite runtime up front, so its memory is not charged to the first model
+    interpreter_class()
+    for variant, model_path in args.models.items():
+        if not os.path.exists(model_path):
+            results.append({"variant": variant, "model": model_path, "error": "model file not found"})
+            continue
+        for num_threads in args.threads:
+            rss_before = current_rss_mb()
+            started = time.perf_counter()
+            try:
+                interpreter = load_interpreter(model_path, num_threads=num_threads)
+            except Exception as e:
+                results.append({"variant": variant, "model": model_path,
+                                "num_threads": num_threads, "error": str(e)})
+                continue
+            load_ms = round((time.perf_counter() - started) * 1000, 2)
+
+            entry = {
+                "variant": variant,
+                "model": model_path,
+                "model_size_kb": round(os.path.getsize(model_path) / 1024, 1),
+                "num_threads": num_threads,
+                "load_ms": load_ms,
+                "batches": {},
+            }
+            try:
+                entry["end_to_end"] = bench_end_to_end(
+                    interpreter, windows, args.iterations, args.warmup)
+                for batch_size in args.batch_sizes:
+                    entry["batches"][str(batch_size)] = bench_invoke(
+                        interpreter, inputs, batch_size, args.iterations, args.warmup)
+            except Exception as e:
+                entry["error"] = str(e)
+            # Measured while the interpreter is still loaded
+            entry["rss_mb"] = current_rss_mb()
+            entry["rss_growth_mb"] = (round(entry["rss_mb"] - rss_before, 1)
+                                      if rss_before is not None and entry["rss_mb"] is not None else None)
+            entry["peak_rss_mb"] = peak_rss_mb()
+            results.append(entry)
+            # Release the interpreter before measuring the next configuration
+            del interpreter
+            gc.collect()
+
+    return {
+        "generated_at": datetime.datetime.now().isoformat(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "iterations": args.iterations,
+        "warmup": args.warmup,
+        "results": results,
+    }
+
+def parse_models(values):
+    """
+    Models given as "name=path" or bare paths; defaults to all known variants.
+    """
+    if not values:
+        return dict(MODEL_VARIANTS)
+    models = {}
+    for value in values:
+        name, _, path = value.rpartition("=")
+        models[name or os.path.splitext(os.path.basename(path))[0]] = path
+    return models
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark multi_output_cnn TFLite inference.")
+    parser.add_argument("--models", nargs="*", help="model files as name=path (default: all variants)")
+    parser.add_argument("--threads", nargs="+", type=int, default=[1, 2, 4])
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 8, 32])
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--windows", type=int, default=64, help="distinct synthetic windows")
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    args = parser.parse_args()
+    args.models = parse_models(args.models)
+
+    report = json.dumps(run(args), indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+
+if __name__ == "__main__":
+    main()
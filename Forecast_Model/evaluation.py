@@ -0,0 +1,115 @@
+import collections
+import threading
+
+import numpy as np
+
+class ForecastEvaluator:
+    """
+    Streaming forecast accuracy with fixed memory.
+
+    Pending forecasts are kept per (station, model) in a ring of `steps + 1`
+    slots indexed by their base bucket, each holding a (steps, features)
+    array (NaN where a step was not published). When the actual values of a
+    bucket arrive, every pending forecast that predicted that bucket is
+    scored in one vectorized step, and running absolute/squared error sums
+    per model, horizon step and feature are updated. A forecast is counted
+    once, when its first step is scored. Nothing grows with
+    time; at most `max_streams` (station, model) rings are kept.
+    """
+
+    def __init__(self, features, steps=24, step_seconds=600, max_streams=256):
+        self.features = list(features)
+        self.steps = steps
+        self.step_seconds = step_seconds
+        self.max_streams = max_streams
+        self.slots = steps + 1
+        self.lock = threading.Lock()
+        self.streams = collections.OrderedDict()  # (station, model) -> (base_index, predictions, scored)
+        self.totals = {}                          # model -> (abs_sum, sq_sum, count)
+        self.forecasts = collections.Counter()    # model -> forecasts scored
+
+    def _bucket(self, timestamp):
+        return int(timestamp // self.step_seconds)
+
+    def add_forecast(self, station, model, base_timestamp, steps, values):
+        """
+        Records a forecast made from the window ending at `base_timestamp`:
+        `values[i]` predicts the bucket `steps[i]` buckets later.
+        """
+        base = self._bucket(base_timestamp)
+        with self.lock:
+            stream = self.streams.get((station, model))
+            if stream is None:
+                stream = (np.full(self.slots, -1, dtype=np.int64),
+                          np.full((self.slots, self.steps, len(self.features)), np.nan),
+                          np.zeros(self.slots, dtype=bool))
+                self.streams[(station, model)] = stream
+                while len(self.streams) > self.max_streams:
+                    self.streams.popitem(last=False)
+            self.streams.move_to_end((station, model))
+            base_index, predictions, scored = stream
+            slot = base % self.slots
+            base_index[slot] = base
+            scored[slot] = False
+            predictions[slot] = np.nan
+            predictions[slot, np.asarray(steps) - 1] = values
+
+    def observe(self, station, timestamp, actual):
+        """
+        Scores every pending forecast of `station` for the bucket starting at
+        `timestamp` against its actual (features,) values.
+        """
+        target = self._bucket(timestamp)
+        actual = np.asarray(actual, dtype=np.float64)
+        with self.lock:
+            for (stream_station, model), (base_index, predictions, scored) in self.streams.items():
+                if stream_station != station:
+                    continue
+                ahead = target - base_index
+                slots = np.nonzero((base_index >= 0) & (ahead >= 1) & (ahead <= self.steps))[0]
+                if not len(slots):
+                    continue
+                step_rows = ahead[slots] - 1
+                errors = predictions[slots, step_rows] - actual   # (k, features)
+                valid = ~np.isnan(errors)
+                errors = np.where(valid, errors, 0.0)
+                abs_sum, sq_sum, count = self.totals.setdefault(
+                    model, (np.zeros((self.steps, len(self.features))),
+                            np.zeros((self.steps, len(self.features))),
+                            np.zeros((self.steps, len(self.features)), dtype=np.int64)))
+                np.add.at(abs_sum, step_rows, np.abs(errors))
+                np.add.at(sq_sum, step_rows, errors ** 2)
+                np.add.at(count, step_rows, valid)
+                first = slots[valid.any(axis=1) & ~scored[slots]]
+                scored[first] = True
+                self.forecasts[model] += len(first)
+
+    def summary(self):
+        """
+        Per model: scored forecast count, overall and per-step MAE/RMSE per
+        feature (None where nothing has been scored yet).
+        """
+        with self.lock:
+            totals = {model: tuple(a.copy() for a in sums) for model, sums in self.totals.items()}
+            forecasts = dict(self.forecasts)
+        result = {}
+        for model, (abs_sum, sq_sum, count) in totals.items():
+            with np.errstate(invalid="ignore", divide="ignore"):
+                mae = abs_sum / count
+                rmse = np.sqrt(sq_sum / count)
+                overall_count = count.sum(axis=0)
+                overall_mae = abs_sum.sum(axis=0) / overall_count
+                overall_rmse = np.sqrt(sq_sum.sum(axis=0) / overall_count)
+            result[model] = {
+                "count": forecasts.get(model, 0),
+                "step_seconds": self.step_seconds,
+                "steps": list(range(1, self.steps + 1)),
+                "mae": {f: _rounded(overall_mae[i]) for i, f in enumerate(self.features)},
+                "rmse": {f: _rounded(overall_rmse[i]) for i, f in enumerate(self.features)},
+                "mae_by_step": {f: [_rounded(v) for v in mae[:, i]] for i, f in enumerate(self.features)},
+                "rmse_by_step": {f: [_rounded(v) for v in rmse[:, i]] for i, f in enumerate(self.features)},
+            }
+        return result
+
+def _rounded(value):
+    return None if not np.isfinite(value) else round(float(value), 4)
@@ -0,0 +1,137 @@
+import logging
+import threading
+import time
+
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+class InferenceExecutor:
+    """
+    Runs model inference off the MQTT network thread.
+
+    Each worker thread owns its own TFLite interpreter (interpreters are not
+    thread-safe). Windows are submitted under a key; if a window for the same
+    key is still waiting when a newer one arrives, the older one is dropped
+    (latest-window-wins), so a slow model never builds up a backlog.
+
+    A worker takes every pending window at once (up to `max_batch`) and runs
+    them as one batch, so many streams cost one interpreter invoke per cycle.
+
+    swap() replaces the model of every worker at once without stopping them;
+    pending windows are kept and run on the new model.
+
+      make_interpreter()               -> a ready interpreter, called once per worker
+      run(interpreter, batch)          -> one result per row of the (N, ...) batch
+      on_result(key, result, context)  -> called on the worker thread after run,
+                                          with the context given to submit()
+    """
+
+    def __init__(self, make_interpreter, run, on_result, workers=1, max_batch=64):
+        self.make_interpreter = make_interpreter
+        self.run = run
+        self.on_result = on_result
+        self.workers = workers
+        self.max_batch = max_batch
+        self.pending = {}           # key -> (window, context, submitted_at), in submission order
+        self.cond = threading.Condition()
+        self.threads = []
+        self.interpreters = []
+        self.generation = 0
+        self.submitted = 0
+        self.coalesced = 0
+        self.completed = 0
+        self.batches = 0
+        self.errors = 0
+        self.last_batch_size = 0
+        self.last_latency = 0.0
+        self.run_time = 0.0
+
+    def start(self):
+        """
+        Loads one interpreter per worker in the calling thread, so a broken
+        model fails at startup, then starts the worker threads.
+        """
+        self.interpreters = [self.make_interpreter() for _ in range(self.workers)]
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, args=(i,),
+                                      name=f"inference-{i}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def swap(self, make_interpreter):
+        """
+        Builds a new interpreter per worker in the calling thread, then
+        replaces them all in one step. Batches already running finish on the
+        old interpreters; every later batch uses the new ones.
+        """
+        interpreters = [make_interpreter() for _ in range(self.workers)]
+        with self.cond:
+            self.make_interpreter = make_interpreter
+            self.interpreters = interpreters
+            self.generation += 1
+
+    def submit(self, key, window, context=None):
+        """
+        Queues a copy of `window` for inference, replacing any window for
+        `key` that has not been picked up yet. `context` is handed back to
+        on_result with the window's result.
+        """
+        with self.cond:
+            if key in self.pending:
+                del self.pending[key]
+                self.coalesced += 1
+            self.pending[key] = (window.copy(), context, time.perf_counter())
+            self.submitted += 1
+            self.cond.notify()
+
+    def stats(self):
+        with self.cond:
+            return {
+                "queue_depth": len(self.pending),
+                "submitted": self.submitted,
+                "coalesced": self.coalesced,
+                "completed": self.completed,
+                "batches": self.batches,
+                "last_batch_size": self.last_batch_size,
+                "errors": self.errors,
+                "last_latency_ms": round(self.last_latency * 1000, 3),
+                "avg_run_ms": round(self.run_time / self.batches * 1000, 3) if self.batches else None,
+                "generation": self.generation,
+            }
+
+    def _take(self):
+        with self.cond:
+            while not self.pending:
+                self.cond.wait()
+            keys = list(self.pending)[:self.max_batch]
+            jobs = [self.pending.pop(key) for key in keys]
+            return keys, jobs
+
+    def _run(self, index):
+        while True:
+            keys, jobs = self._take()
+            interpreter = self.interpreters[index]
+            batch = np.concatenate([window for window, _, _ in jobs])
+            failed = 0
+            started = time.perf_counter()
+            try:
+                results = self.run(interpreter, batch)
+            except Exception as e:
+                log.error("Error running inference for %s: %s", keys, e)
+                results = []
+                failed = len(keys)
+            run_time = time.perf_counter() - started
+            for key, (_, context, _), result in zip(keys, jobs, results):
+                try:
+                    self.on_result(key, result, context)
+                except Exception as e:
+                    log.error("Error handling inference result for %s: %s", key, e)
+                    failed += 1
+            with self.cond:
+                self.batches += 1
+                self.run_time += run_time
+                self.completed += len(keys)
+                self.errors += failed
+                self.last_batch_size = len(keys)
+                self.last_latency = time.perf_counter() - min(t for _, _, t in jobs)
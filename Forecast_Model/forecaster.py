@@ -0,0 +1,316 @@
+import datetime
+import logging
+import os
+import random
+import time
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+#############################
+# Model Configuration
+#############################
+
+CACHE_SIZE = 27  # Cache 27 readings (one every 10 minutes)
+
+# Sensor reading keys (as produced by the sensors)
+sensor_feature_columns = ["air_pressure", "temperature", "humidity", "wind_speed"]
+# Mapping from sensor keys to training keys
+key_mapping = {
+    "air_pressure": "p (mbar)",
+    "temperature": "T (degC)",
+    "humidity": "rh (%)",
+    "wind_speed": "wv (m/s)"
+}
+
+# Example training statistics (replace with your actual values)
+train_mean = {
+    "p (mbar)": 988.656301,
+    "T (degC)": 9.107596,
+    "rh (%)": 75.904082,
+    "wv (m/s)": 2.15457
+}
+train_std = {
+    "p (mbar)": 8.296812,
+    "T (degC)": 8.654242,
+    "rh (%)": 16.557117,
+    "wv (m/s)": 1.530114
+}
+
+# Normalization constants ordered like sensor_feature_columns, computed once
+mean_arr = np.array([train_mean[key_mapping[sensor_key]] for sensor_key in sensor_feature_columns], dtype=np.float32)
+std_arr  = np.array([train_std[key_mapping[sensor_key]] for sensor_key in sensor_feature_columns], dtype=np.float32)
+
+# Model input parameters (should match your training configuration)
+TIME_STEPS = CACHE_SIZE  # 27 readings expected
+NUM_FEATURES = 4         # must equal len(sensor_feature_columns)
+
+# Model output: OUTPUT_STEPS predictions, one per STEP_SECONDS after the last input
+OUTPUT_STEPS = 24
+STEP_SECONDS = 600
+# Output indices published by default: every step ("all"), or e.g. "5,11,17,23"
+# for the 1 h, 2 h, 3 h and 4 h ahead predictions only
+DEFAULT_HORIZON = os.getenv("FORECAST_HORIZON", "all")
+
+#############################
+# Load TFLite Model
+#############################
+tflite_model_path = "multi_output_cnn.tflite"
+
+# Exported model variants, by precision
+MODEL_VARIANTS = {
+    "float32": "multi_output_cnn.tflite",
+    "float16": "multi_output_cnn_float16.tflite",
+    "int8": "multi_output_cnn_int8.tflite",
+}
+
+# Held-out windows used by the automatic variant check:
+#   inputs (N, TIME_STEPS, NUM_FEATURES) normalized, labels (N, 24, NUM_FEATURES) unnormalized
+HOLDOUT_PATH = "holdout.npz"
+# A variant may be at most this much worse than float32 (relative MAE with labels,
+# or mean absolute deviation in std units from the float32 output without labels)
+AUTO_TOLERANCE = float(os.getenv("FORECAST_AUTO_TOLERANCE", 0.05))
+
+def interpreter_class():
+    """
+    Prefers the lightweight tflite_runtime package, which starts in a fraction
+    of the time and memory of a full TensorFlow import; falls back to tf.lite.
+    """
+    try:
+        from tflite_runtime.interpreter import Interpreter
+    except ImportError:
+        import tensorflow as tf
+        Interpreter = tf.lite.Interpreter
+    return Interpreter
+
+def load_interpreter(model_path=tflite_model_path, num_threads=None, model_content=None):
+    """
+    Creates a ready-to-use interpreter, from a file or from the model bytes.
+    Interpreters are not thread-safe, so every inference thread loads its own.
+    """
+    if model_content is not None:
+        interpreter = interpreter_class()(model_content=model_content, num_threads=num_threads)
+    else:
+        interpreter = interpreter_class()(model_path=model_path, num_threads=num_threads)
+    interpreter.allocate_tensors()
+    return interpreter
+
+# Outputs further than this many training std from the mean fail validation
+VALIDATION_MAX_STD = 20.0
+
+def reference_window():
+    """
+    Normalized (1, TIME_STEPS, NUM_FEATURES) window used to validate models:
+    the first held-out window if available, else a fixed synthetic one.
+    """
+    if os.path.exists(HOLDOUT_PATH):
+        return np.load(HOLDOUT_PATH)["inputs"][:1].astype(np.float32)
+    return preprocess_sensor_data(generate_fake_windows(1)[0])
+
+def validate_interpreter(interpreter):
+    """
+    Runs the reference window through a newly loaded model and raises
+    ValueError unless it returns finite, plausible (1, OUTPUT_STEPS,
+    NUM_FEATURES) predictions. Returns the predictions.
+    """
+    predictions = predict(interpreter, reference_window())
+    if predictions.shape != (1, OUTPUT_STEPS, NUM_FEATURES):
+        raise ValueError(f"unexpected output shape {predictions.shape}")
+    if not np.all(np.isfinite(predictions)):
+        raise ValueError("non-finite predictions")
+    deviation = float(np.max(np.abs(predictions - mean_arr) / std_arr))
+    if deviation > VALIDATION_MAX_STD:
+        raise ValueError(f"predictions {deviation:.1f} std away from the training mean")
+    return predictions
+
+def select_model_path(variant="float32", num_threads=None):
+    """
+    Returns the model file for a variant name ("float32", "float16", "int8"),
+    or picks one with auto_select_variant() when variant is "auto".
+    Falls back to the float32 model when the requested file does not exist.
+    """
+    if variant == "auto":
+        variant = auto_select_variant(num_threads=num_threads)
+    path = MODEL_VARIANTS.get(variant, variant)
+    if not os.path.exists(path):
+        log.warning("Model variant '%s' not found at %s; using %s.", variant, path, tflite_model_path)
+        return tflite_model_path
+    return path
+
+def auto_select_variant(num_threads=None, iterations=50):
+    """
+    Accuracy-vs-latency check: runs every available variant on the held-out
+    windows and returns the fastest one whose error stays within AUTO_TOLERANCE
+    of the float32 model. Without a holdout file, synthetic windows are used
+    and accuracy is measured against the float32 model's own output.
+    """
+    if os.path.exists(HOLDOUT_PATH):
+        holdout = np.load(HOLDOUT_PATH)
+        inputs, labels = holdout["inputs"].astype(np.float32), holdout["labels"]
+    else:
+        inputs = np.concatenate([preprocess_sensor_data(w) for w in generate_fake_windows(64)])
+        labels = None
+
+    scores = {}
+    for variant, path in MODEL_VARIANTS.items():
+        if not os.path.exists(path):
+            continue
+        interpreter = load_interpreter(path, num_threads=num_threads)
+        outputs = np.concatenate([predict(interpreter, inputs[i:i + 1]) for i in range(len(inputs))])
+        samples = []
+        for i in range(iterations):
+            started = time.perf_counter()
+            predict(interpreter, inputs[i % len(inputs):i % len(inputs) + 1])
+            samples.append(time.perf_counter() - started)
+        scores[variant] = {"outputs": outputs, "latency": float(np.median(samples))}
+
+    if "float32" not in scores:
+        return "float32"
+    reference = labels if labels is not None else scores["float32"]["outputs"]
+    for score in scores.values():
+        score["error"] = float(np.mean(np.abs(score["outputs"] - reference) / std_arr))
+    baseline = scores["float32"]["error"]
+    limit = baseline * (1 + AUTO_TOLERANCE) if labels is not None else AUTO_TOLERANCE
+
+    accepted = [v for v, score in scores.items() if score["error"] <= limit or v == "float32"]
+    chosen = min(accepted, key=lambda v: scores[v]["latency"])
+    for variant, score in scores.items():
+        log.info("Variant %s: error %.4f, latency %.3f ms%s", variant, score["error"],
+                 score["latency"] * 1000, " <- selected" if variant == chosen else "")
+    return chosen
+
+#############################
+# Helper Functions
+#############################
+def generate_fake_windows(count, seed=0):
+    """
+    Generates `count` windows of TIME_STEPS fake sensor readings, using the
+    same value ranges as generate_fake.py but with the sensor keys.
+    """
+    rng = random.Random(seed)
+    windows = []
+    for _ in range(count):
+        windows.append([{
+            "temperature": round(rng.uniform(19.5, 20.5), 2),
+            "wind_speed": round(rng.uniform(2.5, 3.5), 2),
+            "air_pressure": round(rng.uniform(1011.0, 1013.0), 2),
+            "humidity": round(rng.uniform(58.0, 62.0), 2),
+        } for _ in range(TIME_STEPS)])
+    return windows
+
+def quantize_input(input_detail, data):
+    """
+    Converts a float32 input to the model's input type. Quantized (int8/uint8)
+    models expect data / scale + zero_point; float models take it unchanged.
+    """
+    dtype = input_detail['dtype']
+    if np.issubdtype(dtype, np.floating):
+        return data.astype(dtype, copy=False)
+    scale, zero_point = input_detail['quantization']
+    if not scale:
+        return data.astype(dtype)
+    info = np.iinfo(dtype)
+    return np.clip(np.round(data / scale + zero_point), info.min, info.max).astype(dtype)
+
+def dequantize_output(output_detail, data):
+    """
+    Converts a quantized model output back to float32.
+    """
+    if np.issubdtype(data.dtype, np.floating):
+        return data.astype(np.float32, copy=False)
+    scale, zero_point = output_detail['quantization']
+    if not scale:
+        return data.astype(np.float32)
+    return (data.astype(np.float32) - zero_point) * scale
+
+def preprocess_sensor_data(sensor_readings):
+    """
+    Converts a list of sensor reading dicts into a normalized input tensor.
+    Sensor readings are expected to have keys: 'air_pressure', 'temperature', 'humidity', 'wind_speed'.
+    Normalization is applied using training values corresponding to:
+      air_pressure -> "p (mbar)"
+      temperature  -> "T (degC)"
+      humidity     -> "rh (%)"
+      wind_speed   -> "wv (m/s)"
+    """
+    # Create a NumPy array with shape (TIME_STEPS, NUM_FEATURES)
+    data = np.array([[entry[sensor_key] for sensor_key in sensor_feature_columns]
+                     for entry in sensor_readings], dtype=np.float32)
+
+    # Normalize the data
+    data = (data - mean_arr) / std_arr
+
+    # Reshape to (1, TIME_STEPS, NUM_FEATURES)
+    return data.reshape(1, TIME_STEPS, NUM_FEATURES)
+
+def predict(interpreter, input_tensor):
+    """
+    Runs the model on a normalized (N, TIME_STEPS, NUM_FEATURES) batch and returns
+    the unnormalized (N, 24, NUM_FEATURES) predictions.
+    The input tensor is resized (and tensors reallocated) only when N changes.
+    """
+    input_detail = interpreter.get_input_details()[0]
+    if tuple(input_detail['shape']) != input_tensor.shape:
+        try:
+            interpreter.resize_tensor_input(input_detail['index'], input_tensor.shape)
+            interpreter.allocate_tensors()
+        except (ValueError, RuntimeError):
+            if len(input_tensor) == 1:
+                raise
+            # Model was exported with a fixed batch size: one invoke per window
+            return np.concatenate([predict(interpreter, input_tensor[i:i + 1])
+                                   for i in range(len(input_tensor))])
+    interpreter.set_tensor(input_detail['index'], quantize_input(input_detail, input_tensor))
+    interpreter.invoke()
+    output_detail = interpreter.get_output_details()[0]
+    predictions = dequantize_output(output_detail, interpreter.get_tensor(output_detail['index']))
+
+    # Unnormalize predictions using training stats (mapping same as input)
+    return predictions * std_arr + mean_arr
+
+def parse_horizon(spec=DEFAULT_HORIZON):
+    """
+    Output indices to publish: "all" for every step, or a comma-separated
+    list of 0-based indices (e.g. "5,11,17,23"). Returns a sorted int array.
+    """
+    if spec in (None, "", "all"):
+        return np.arange(OUTPUT_STEPS)
+    indices = sorted({int(index) for index in str(spec).split(",") if index.strip()})
+    if not indices or indices[0] < 0 or indices[-1] >= OUTPUT_STEPS:
+        raise ValueError(f"forecast horizon indices must be within 0..{OUTPUT_STEPS - 1}: {spec!r}")
+    return np.array(indices)
+
+def select_horizon(predictions_unnorm, horizon):
+    """
+    (N, OUTPUT_STEPS, NUM_FEATURES) -> (N, len(horizon), NUM_FEATURES), rounded
+    to 2 decimals, for the whole batch in one vectorized step.
+    """
+    # float64 first, so the rounded values serialize as short decimals
+    return np.round(predictions_unnorm[:, horizon, :].astype(np.float64), 2)
+
+def forecast_columns(selected, base_timestamp, horizon, step_seconds=STEP_SECONDS):
+    """
+    Column-form forecast of one window from its (len(horizon), NUM_FEATURES)
+    selected predictions: one array per feature plus the timing, where
+    output index i is (i + 1) * step_seconds after base_timestamp, the time of
+    the last input bucket.
+    """
+    columns = selected.T.tolist()
+    return {
+        "base_timestamp": datetime.datetime.fromtimestamp(base_timestamp).isoformat(),
+        "step_seconds": step_seconds,
+        "steps": (np.asarray(horizon) + 1).tolist(),
+        **dict(zip(sensor_feature_columns, columns)),
+    }
+
+def run_prediction(interpreter, input_tensor, base_timestamp=None, horizon=None):
+    """
+    Runs TFLite inference on a normalized (N, TIME_STEPS, NUM_FEATURES) tensor,
+    as built by preprocess_sensor_data or SensorWindow.view(), and unnormalizes the output.
+    Returns one column-form forecast per window (see forecast_columns); without
+    a base_timestamp the steps count from now.
+    """
+    horizon = parse_horizon() if horizon is None else horizon
+    base_timestamp = time.time() if base_timestamp is None else base_timestamp
+    selected = select_horizon(predict(interpreter, input_tensor), horizon)
+    return [forecast_columns(window, base_timestamp, horizon) for window in selected]
@@ -1,183 +1,387 @@
 import json
-import numpy as np
-import pandas as pd
+import logging
+import os
+import sys
+import threading
+import time
 import datetime
-import tensorflow as tf
+import urllib.request
+import numpy as np
 import paho.mqtt.client as mqtt
-import requests
+from prometheus_client import Counter, Gauge, Histogram
+
+# Shared modules live in the repository root (common/)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common import metrics, payload_codec
+from common.stations import (
+    EVALUATION_TOPIC, FORECAST_TOPIC, FORECAST_STATION_TOPIC, SENSOR_TOPIC, SENSOR_STATION_TOPICS,
+    forecast_topic, station_from_message,
+)
+
+from evaluation import ForecastEvaluator
+from executor import InferenceExecutor
+from forecaster import (
+    NUM_FEATURES, OUTPUT_STEPS, TIME_STEPS, mean_arr, std_arr, sensor_feature_columns,
+    forecast_columns, load_interpreter, parse_horizon, predict, select_horizon,
+    select_model_path, validate_interpreter,
+)
+from model_watcher import ModelWatcher
+from resampler import BucketResampler, to_epoch
+from window import SensorWindow
+
+metrics.configure_logging()
+log = logging.getLogger("inference")
 
 #############################
 # Configuration
 #############################
 
+# Broker used when the ngrok port cannot be discovered
+NGROK_MQTT_HOST = "0.tcp.ap.ngrok.io"
+NGROK_API_URL = "http://127.0.0.1:4040/api/tunnels"
+# Upper bound on broker discovery, so a missing ngrok agent cannot stall startup
+NGROK_API_TIMEOUT = float(os.getenv("NGROK_API_TIMEOUT", 2))
+
 # Function to retrieve dynamic ngrok port (if using ngrok)
-def get_ngrok_mqtt_port():
+def get_ngrok_mqtt_port(timeout=NGROK_API_TIMEOUT):
     try:
-        response = requests.get("http://127.0.0.1:4040/api/tunnels")
-        tunnels = response.json().get("tunnels", [])
+        with urllib.request.urlopen(NGROK_API_URL, timeout=timeout) as response:
+            tunnels = json.load(response).get("tunnels", [])
         for tunnel in tunnels:
             if "tcp" in tunnel["public_url"]:
                 return int(tunnel["public_url"].split(":")[-1])
     except Exception as e:
-        print(f"Error fetching ngrok port: {e}")
+        log.warning("Error fetching ngrok port: %s", e)
     return None
 
-ngrok_port = get_ngrok_mqtt_port()
-if ngrok_port:
-    MQTT_BROKER = "0.tcp.ap.ngrok.io"
-    MQTT_PORT = ngrok_port
-    print(f"Using dynamic ngrok port: {ngrok_port}")
-else:
-    MQTT_BROKER = "0.tcp.ap.ngrok.io"
-    MQTT_PORT = 8883
-    print("Failed to retrieve ngrok port; using port 8883.")
-
-MQTT_TOPIC_SUB = "sensor/data"
-MQTT_TOPIC_PUB = "forecast/predictions"
-CACHE_SIZE = 27  # Cache 27 readings (one every 10 minutes)
-
-# Sensor reading keys (as produced by the sensors)
-sensor_feature_columns = ["air_pressure", "temperature", "humidity", "wind_speed"]
-# Mapping from sensor keys to training keys
-key_mapping = {
-    "air_pressure": "p (mbar)",
-    "temperature": "T (degC)",
-    "humidity": "rh (%)",
-    "wind_speed": "wv (m/s)"
-}
-
-# Example training statistics (replace with your actual values)
-train_mean = pd.Series({
-    "p (mbar)": 988.656301,
-    "T (degC)": 9.107596,
-    "rh (%)": 75.904082,
-    "wv (m/s)": 2.15457
-})
-train_std = pd.Series({
-    "p (mbar)": 8.296812,
-    "T (degC)": 8.654242,
-    "rh (%)": 16.557117,
-    "wv (m/s)": 1.530114
-})
-
-# Model input parameters (should match your training configuration)
-TIME_STEPS = CACHE_SIZE  # 27 readings expected
-NUM_FEATURES = 4         # must equal len(sensor_feature_columns)
+def discover_broker():
+    """
+    Returns (host, port) of the MQTT broker. MQTT_BROKER/MQTT_PORT from the
+    environment win; otherwise the ngrok API is asked, bounded by NGROK_API_TIMEOUT.
+    """
+    if os.getenv("MQTT_BROKER") and os.getenv("MQTT_PORT"):
+        return os.getenv("MQTT_BROKER"), int(os.getenv("MQTT_PORT"))
+    ngrok_port = get_ngrok_mqtt_port()
+    if ngrok_port:
+        log.info("Using dynamic ngrok port: %d", ngrok_port)
+        return NGROK_MQTT_HOST, ngrok_port
+    log.warning("Failed to retrieve ngrok port; using port 8883.")
+    return NGROK_MQTT_HOST, 8883
+
+# Legacy single-station topics; the station may also be named in the payload
+MQTT_TOPIC_SUB = SENSOR_TOPIC
+MQTT_TOPIC_PUB = FORECAST_TOPIC
+# Per-station topics (see common/stations.py)
+MQTT_TOPIC_SUB_STATIONS = SENSOR_STATION_TOPICS
+MQTT_TOPIC_PUB_STATION = FORECAST_STATION_TOPIC
+
+# Raw readings are averaged into buckets of this width before reaching the model
+RESAMPLE_STEP_SECONDS = int(os.getenv("RESAMPLE_STEP_SECONDS", 600))
+# How long a bucket stays open for late readings after it ends
+RESAMPLE_LATENESS_SECONDS = int(os.getenv("RESAMPLE_LATENESS_SECONDS", 30))
+# Empty buckets interpolated before the window is restarted instead
+RESAMPLE_MAX_FILL = int(os.getenv("RESAMPLE_MAX_FILL", 3))
+# How often buckets are closed by wall clock when readings stop arriving
+RESAMPLE_TICK_SECONDS = 5
+
+# Inference worker threads (each with its own interpreter) and TFLite threads per interpreter
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", 1))
+INFERENCE_NUM_THREADS = int(os.getenv("INFERENCE_NUM_THREADS", 0)) or None
+# Maximum number of station windows run through the model in one invoke
+INFERENCE_MAX_BATCH = int(os.getenv("INFERENCE_MAX_BATCH", 64))
+# Model precision: "float32", "float16", "int8", or "auto" to pick the fastest
+# variant that passes the accuracy check
+MODEL_VARIANT = os.getenv("FORECAST_MODEL_VARIANT", "float32")
+# Forecast steps to publish (FORECAST_HORIZON: "all" or e.g. "5,11,17,23")
+HORIZON = parse_horizon()
+# How often the model file is checked for a new version to hot-swap (0 disables)
+MODEL_WATCH_SECONDS = float(os.getenv("MODEL_WATCH_SECONDS", 30))
+# Optional candidate model run in shadow mode on the same windows: its forecasts
+# are scored against the actual buckets next to the live model's, never published
+SHADOW_MODEL_PATH = os.getenv("SHADOW_MODEL_PATH")
+# How often the live-vs-shadow comparison is printed
+SHADOW_REPORT_SECONDS = float(os.getenv("SHADOW_REPORT_SECONDS", 600))
+# Published forecasts are scored against the buckets they predicted; the running
+# MAE/RMSE per feature and step is published (retained) this often (0 disables scoring)
+EVALUATION_PUBLISH_SECONDS = float(os.getenv("EVALUATION_PUBLISH_SECONDS", 60))
+# Prometheus metrics are served on this port at /metrics (0 disables)
+METRICS_PORT = int(os.getenv("METRICS_PORT", 9102))
 
 #############################
-# Load TFLite Model
+# Metrics
 #############################
-tflite_model_path = "multi_output_cnn.tflite"
-interpreter = tf.lite.Interpreter(model_path=tflite_model_path)
-interpreter.allocate_tensors()
-input_details = interpreter.get_input_details()
-output_details = interpreter.get_output_details()
-
-print("✅ TFLite Model Loaded!")
-print("Input details:", input_details)
-print("Output details:", output_details)
+# Time spent per stage of the sensor -> forecast path: payload decoding,
+# resampling into the window, model invoke, horizon selection and publishing
+STAGE_SECONDS = Histogram(
+    "forecast_stage_seconds", "Time spent per forecast pipeline stage", ["stage"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+READINGS_RECEIVED = Counter("forecast_readings_received_total", "Sensor readings decoded from MQTT")
+READINGS_INVALID = Counter("forecast_readings_invalid_total", "Sensor payloads or readings that could not be used")
+BUCKETS_CLOSED = Counter("forecast_buckets_closed_total", "Resampled buckets appended to a window", ["filled"])
+FORECASTS_PUBLISHED = Counter("forecast_published_total", "Forecasts published to MQTT")
 
 #############################
-# Helper Functions
+# Load TFLite Model
 #############################
-def preprocess_sensor_data(sensor_readings):
+model_path = None  # chosen in main()
+
+def interpreter_factory(path, model_content=None):
     """
-    Converts a list of sensor reading dicts into a normalized input tensor.
-    Sensor readings are expected to have keys: 'air_pressure', 'temperature', 'humidity', 'wind_speed'.
-    Normalization is applied using training values corresponding to:
-      air_pressure -> "p (mbar)"
-      temperature  -> "T (degC)"
-      humidity     -> "rh (%)"
-      wind_speed   -> "wv (m/s)"
+    Returns a make_interpreter() for the executor that loads the model at
+    `path` (or from `model_content`, the already validated bytes) and warms it up.
     """
-    # Create a NumPy array with shape (TIME_STEPS, NUM_FEATURES)
-    data = np.array([[entry[sensor_key] for sensor_key in sensor_feature_columns] 
-                     for entry in sensor_readings], dtype=np.float32)
-    
-    # Build arrays for mean and std using the mapped training keys
-    mean_arr = np.array([train_mean[key_mapping[sensor_key]] for sensor_key in sensor_feature_columns], dtype=np.float32)
-    std_arr  = np.array([train_std[key_mapping[sensor_key]] for sensor_key in sensor_feature_columns], dtype=np.float32)
-    
-    # Normalize the data
-    data = (data - mean_arr) / std_arr
-    
-    # Reshape to (1, TIME_STEPS, NUM_FEATURES)
-    return data.reshape(1, TIME_STEPS, NUM_FEATURES)
-
-def run_prediction(sensor_readings):
+    def make_interpreter():
+        interpreter = load_interpreter(path, num_threads=INFERENCE_NUM_THREADS, model_content=model_content)
+        # Warm-up invoke, so the first real forecast does not pay for lazy allocations
+        predict(interpreter, np.zeros((1, TIME_STEPS, NUM_FEATURES), dtype=np.float32))
+        log.info("✅ TFLite Model Loaded! (%s)", path)
+        log.debug("Input details: %s", interpreter.get_input_details())
+        log.debug("Output details: %s", interpreter.get_output_details())
+        return interpreter
+    return make_interpreter
+
+def make_interpreter():
+    return interpreter_factory(model_path)()
+
+def reload_model(target, path):
     """
-    Runs TFLite inference on the given sensor readings and unnormalizes the output.
-    Only predictions at indices [5, 11, 17, 23] are kept.
-    Returns a list of forecast objects with a timestamp and sensor predictions.
+    Called by a ModelWatcher when `path` changed. The new file is read once,
+    validated against the reference window and swapped into the `target`
+    executor; the station windows are untouched, so forecasting continues
+    with the next bucket. A model that fails validation is not used.
     """
-    input_tensor = preprocess_sensor_data(sensor_readings)
-    interpreter.set_tensor(input_details[0]['index'], input_tensor)
-    interpreter.invoke()
-    predictions = interpreter.get_tensor(output_details[0]['index'])
-    
-    # Unnormalize predictions using training stats (mapping same as input)
-    mean_arr = np.array([train_mean[key_mapping[sensor_key]] for sensor_key in sensor_feature_columns], dtype=np.float32)
-    std_arr  = np.array([train_std[key_mapping[sensor_key]] for sensor_key in sensor_feature_columns], dtype=np.float32)
-    predictions_unnorm = predictions.copy()
-    predictions_unnorm[0] = predictions_unnorm[0] * std_arr + mean_arr
-
-    # Select indices 5, 11, 17, and 23 (forecast for next 1h, 2h, 3h, 4h)
-    selected_indices = [5, 11, 17, 23]
-    forecast = []
-    start_dt = datetime.datetime.now()
-    # For each selected index, assign a forecast time (1h, 2h, 3h, 4h ahead)
-    for idx, i in enumerate(selected_indices):
-        forecast_timestamp = (start_dt + datetime.timedelta(hours=idx + 1)).isoformat()
-        pred = predictions_unnorm[0][i]
-        # Create forecast using sensor reading keys
-        forecast.append({
-            "timestamp": forecast_timestamp,
-            "air_pressure": round(float(pred[0]), 2),
-            "temperature": round(float(pred[1]), 2),
-            "humidity": round(float(pred[2]), 2),
-            "wind_speed": round(float(pred[3]), 2)
-        })
-    return forecast
+    with open(path, "rb") as f:
+        content = f.read()
+    try:
+        validate_interpreter(load_interpreter(path, num_threads=INFERENCE_NUM_THREADS, model_content=content))
+    except (ValueError, RuntimeError) as e:
+        log.error("Rejected new model %s: %s", path, e)
+        return
+    target.swap(interpreter_factory(path, content))
+    log.info("Swapped in new model %s (generation %d).", path, target.generation)
 
 #############################
 # MQTT Client Setup
 #############################
-sensor_cache = []  # Global cache for sensor readings
+class Station:
+    """
+    Per-station state: a resampler feeding a normalized window of the last
+    CACHE_SIZE 10-minute buckets.
+    """
+
+    def __init__(self, station_id):
+        self.id = station_id
+        self.window = SensorWindow(TIME_STEPS, mean_arr, std_arr)
+        self.resampler = BucketResampler(
+            sensor_feature_columns, self.on_bucket,
+            step=RESAMPLE_STEP_SECONDS,
+            lateness=RESAMPLE_LATENESS_SECONDS,
+            max_fill=RESAMPLE_MAX_FILL,
+            on_reset=self.on_gap,
+        )
+
+    def on_bucket(self, bucket_start, values, filled):
+        """
+        Called by the resampler for every closed bucket. Queues one prediction
+        per bucket once the window is full.
+        """
+        if evaluator is not None and not filled:
+            # Score the earlier forecasts that predicted this bucket
+            evaluator.observe(self.id, bucket_start, values)
+        with STAGE_SECONDS.labels("window").time():
+            self.window.append(values, bucket_start)
+        BUCKETS_CLOSED.labels(str(bool(filled)).lower()).inc()
+        if log.isEnabledFor(logging.DEBUG):
+            bucket_time = datetime.datetime.fromtimestamp(bucket_start).isoformat()
+            log.debug("[%s] Closed bucket %s%s. Window size: %d", self.id, bucket_time,
+                      " (interpolated)" if filled else "", self.window.count)
+        if self.window.full:
+            # Forecast steps count from the window's last bucket
+            executor.submit(self.id, self.window.view(), bucket_start)
+            if shadow_executor is not None:
+                shadow_executor.submit(self.id, self.window.view(), bucket_start)
+
+    def on_gap(self):
+        log.warning("[%s] Sensor gap too long to interpolate; restarting the window.", self.id)
+        self.window.clear()
+
+stations = {}
+stations_lock = threading.Lock()
+
+def get_station(station_id):
+    with stations_lock:
+        station = stations.get(station_id)
+        if station is None:
+            station = stations[station_id] = Station(station_id)
+            log.info("Tracking new station: %s", station_id)
+        return station
+
+def run_forecasts(interpreter, batch):
+    # Unnormalize and cut the whole batch down to the published steps at once
+    with STAGE_SECONDS.labels("invoke").time():
+        preds = predict(interpreter, batch)
+    with STAGE_SECONDS.labels("horizon").time():
+        return select_horizon(preds, HORIZON)
+
+def publish_forecast(station_id, selected, bucket_start):
+    """
+    Called on an inference thread with the finished forecast of one station.
+    Published in column form: base_timestamp, step_seconds, steps and one
+    array per feature.
+    """
+    with STAGE_SECONDS.labels("publish").time():
+        publish_payload = {"station": station_id, **forecast_columns(selected, bucket_start, HORIZON)}
+        encoded = json.dumps(publish_payload)
+        client.publish(forecast_topic(station_id), encoded)
+    FORECASTS_PUBLISHED.inc()
+    log.info("Published forecast for %s", station_id)
+    log.debug("Forecast for %s: %s", station_id, encoded)
+    if evaluator is not None:
+        evaluator.add_forecast(station_id, model_key("live", executor), bucket_start, HORIZON + 1, selected)
+
+def record_shadow_forecast(station_id, selected, bucket_start):
+    evaluator.add_forecast(station_id, model_key("shadow", shadow_executor), bucket_start, HORIZON + 1, selected)
+
+def model_key(role, model_executor):
+    # Scores are kept per model generation, so a hot-swapped model starts
+    # with its own totals instead of mixing with its predecessor's
+    return f"{role}@{model_executor.generation}"
+
+executor = InferenceExecutor(
+    make_interpreter, run_forecasts, publish_forecast,
+    workers=INFERENCE_WORKERS,
+    max_batch=INFERENCE_MAX_BATCH,
+)
+
+# Online accuracy of the live model (and the shadow candidate, if any)
+evaluator = None
+if EVALUATION_PUBLISH_SECONDS > 0 or SHADOW_MODEL_PATH:
+    evaluator = ForecastEvaluator(sensor_feature_columns, steps=OUTPUT_STEPS,
+                                  step_seconds=RESAMPLE_STEP_SECONDS)
+
+# Shadow mode: the candidate gets its own worker, so it never delays live forecasts
+shadow_executor = None
+if SHADOW_MODEL_PATH:
+    shadow_executor = InferenceExecutor(
+        interpreter_factory(SHADOW_MODEL_PATH), run_forecasts, record_shadow_forecast,
+        workers=1,
+        max_batch=INFERENCE_MAX_BATCH,
+    )
+
+# Executor and station state, read when /metrics is scraped
+Gauge("forecast_queue_depth", "Station windows waiting for inference").set_function(
+    lambda: len(executor.pending))
+Gauge("forecast_last_latency_seconds", "Submit-to-result time of the last inference batch").set_function(
+    lambda: executor.last_latency)
+Gauge("forecast_model_generation", "Times the live model has been hot-swapped").set_function(
+    lambda: executor.generation)
+Gauge("forecast_stations", "Stations with a window").set_function(lambda: len(stations))
+
+def publish_evaluation():
+    # Retained, so the dashboard server has the latest scores as soon as it subscribes
+    while True:
+        time.sleep(EVALUATION_PUBLISH_SECONDS)
+        current = {"live": model_key("live", executor)}
+        if shadow_executor is not None:
+            current["shadow"] = model_key("shadow", shadow_executor)
+        payload = {
+            "generated_at": datetime.datetime.now().isoformat(),
+            # Keys of the models in use now; "models" also keeps swapped-out generations
+            "current": current,
+            "models": evaluator.summary(),
+        }
+        client.publish(EVALUATION_TOPIC, json.dumps(payload), retain=True)
+
+def report_shadow():
+    # Periodic live-vs-candidate comparison: error against actual buckets and model run time
+    while True:
+        time.sleep(SHADOW_REPORT_SECONDS)
+        summary = evaluator.summary()
+        for name, model_executor in (("live", executor), ("shadow", shadow_executor)):
+            key = model_key(name, model_executor)
+            scores = summary.get(key)
+            stats = model_executor.stats()
+            mae = scores["mae"] if scores else {}
+            log.info("[shadow] %s: %d forecasts scored, MAE %s, run %s ms/batch, latency %s ms",
+                     key, scores["count"] if scores else 0, mae,
+                     stats["avg_run_ms"], stats["last_latency_ms"])
+
+def resample_timer():
+    # Close buckets on time even when no new readings arrive
+    while True:
+        time.sleep(RESAMPLE_TICK_SECONDS)
+        now = time.time()
+        with stations_lock:
+            current = list(stations.values())
+        for station in current:
+            station.resampler.tick(now)
 
 def on_connect(client, userdata, flags, rc):
-    print("Connected to MQTT Broker with result code", rc)
-    client.subscribe("sensor/data")
+    log.info("Connected to MQTT Broker with result code %s", rc)
+    client.subscribe(MQTT_TOPIC_SUB)
+    client.subscribe(MQTT_TOPIC_SUB_STATIONS)
 
 def on_message(client, userdata, message):
-    global sensor_cache
     try:
-        reading = json.loads(message.payload.decode("utf-8"))
-        # Expect sensor reading keys: 'temperature', 'wind_speed', 'air_pressure', 'humidity'
-        missing_keys = [key for key in sensor_feature_columns if key not in reading]
-        if missing_keys:
-            print(f"Warning: Missing keys {missing_keys} in sensor reading: {reading}")
-            return
-        # Optionally add a timestamp if not present
-        if "timestamp" not in reading:
-            reading["timestamp"] = datetime.datetime.now().isoformat()
-        sensor_cache.append(reading)
-        print(f"Received reading. Cache size: {len(sensor_cache)}")
-        
-        # When we have at least CACHE_SIZE readings, run prediction
-        if len(sensor_cache) >= CACHE_SIZE:
-            window = sensor_cache[-CACHE_SIZE:]
-            forecast = run_prediction(window)
-            publish_payload = {"predictions": forecast}
-            client.publish("forecast/predictions", json.dumps(publish_payload))
-            print("Published Forecast:")
-            print(json.dumps(publish_payload, indent=2))
-    except Exception as e:
-        print("Error processing MQTT message:", e)
+        with STAGE_SECONDS.labels("decode").time():
+            readings = payload_codec.decode(message.payload)
+    except (ValueError, UnicodeDecodeError) as e:
+        READINGS_INVALID.inc()
+        log.warning("Error decoding sensor payload: %s", e)
+        return
+    READINGS_RECEIVED.inc(len(readings))
+    for reading in readings:
+        try:
+            # Expect sensor reading keys: 'temperature', 'wind_speed', 'air_pressure', 'humidity'.
+            # Individual missing values are carried forward by the resampler.
+            if not any(reading.get(key) is not None for key in sensor_feature_columns):
+                READINGS_INVALID.inc()
+                log.warning("No sensor values in reading: %s", reading)
+                continue
+            # Use the reading's own timestamp if present, otherwise its arrival time
+            timestamp = to_epoch(reading["timestamp"]) if "timestamp" in reading else time.time()
+            get_station(station_from_message(message.topic, reading)).resampler.add(timestamp, reading)
+        except Exception as e:
+            READINGS_INVALID.inc()
+            log.error("Error processing MQTT message: %s", e)
+
+client = None  # created in main()
 
-client = mqtt.Client()
-client.on_connect = on_connect
-client.on_message = on_message
+def main():
+    global client, model_path
+    client = mqtt.Client()
+    client.on_connect = on_connect
+    client.on_message = on_message
+
+    # Connect in the background while the model loads and warms up
+    broker, port = discover_broker()
+    log.info("Connecting to MQTT Broker %s:%d...", broker, port)
+    client.connect_async(broker, port, 60)
+    client.loop_start()
+
+    model_path = select_model_path(MODEL_VARIANT, num_threads=INFERENCE_NUM_THREADS)
+    executor.start()
+    metrics.serve(METRICS_PORT)
+    if shadow_executor is not None:
+        shadow_executor.start()
+        threading.Thread(target=report_shadow, name="shadow-report", daemon=True).start()
+    if EVALUATION_PUBLISH_SECONDS > 0:
+        threading.Thread(target=publish_evaluation, name="evaluation-publish", daemon=True).start()
+    threading.Thread(target=resample_timer, name="resample-timer", daemon=True).start()
+
+    # Hot reload: new model files are validated and swapped in without a restart
+    if MODEL_WATCH_SECONDS > 0:
+        ModelWatcher(model_path, lambda path: reload_model(executor, path), MODEL_WATCH_SECONDS).start()
+        if shadow_executor is not None:
+            ModelWatcher(SHADOW_MODEL_PATH, lambda path: reload_model(shadow_executor, path),
+                         MODEL_WATCH_SECONDS).start()
+
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        client.loop_stop()
+        client.disconnect()
 
-print("Connecting to MQTT Broker...")
-client.connect(MQTT_BROKER, MQTT_PORT, 60)
-client.loop_forever()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import logging
+import os
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+class ModelWatcher(threading.Thread):
+    """
+    Polls a model file every `interval` seconds and calls on_change(path)
+    once a new version has been stable (same size and mtime) for one full
+    interval, so a file that is still being copied is never loaded.
+    Replacing the file with an atomic rename (write model.tmp, then
+    `mv model.tmp model.tflite`) is the safest way to publish a new model.
+    """
+
+    def __init__(self, path, on_change, interval=30.0):
+        super().__init__(name=f"model-watcher-{os.path.basename(path)}", daemon=True)
+        self.path = path
+        self.on_change = on_change
+        self.interval = interval
+        self.current = self._signature()
+        self.changes = 0
+
+    def _signature(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def run(self):
+        candidate = None
+        while True:
+            time.sleep(self.interval)
+            signature = self._signature()
+            if signature is None or signature == self.current:
+                candidate = None
+                continue
+            if signature != candidate:
+                # Changed since the last poll: wait until it stops changing
+                candidate = signature
+                continue
+            self.current = signature
+            candidate = None
+            self.changes += 1
+            try:
+                self.on_change(self.path)
+            except Exception as e:
+                log.error("Error reloading model %s: %s", self.path, e)
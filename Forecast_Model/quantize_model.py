@@ -0,0 +1,63 @@
+"""
+Exports float16 and int8 TFLite variants of the trained multi-output CNN.
+
+Run on the training machine (needs the full TensorFlow package and
+multi_output_cnn.keras from time_series_analysis.ipynb):
+
+    python3 quantize_model.py --csv jena_climate_2009_2016.csv
+
+The int8 model is fully integer-quantized (int8 input and output); inference.py
+quantizes its input and dequantizes its output using the tensor parameters.
+Calibration uses windows from the Jena CSV when given, otherwise standard
+normal windows, which match the normalized training data in scale.
+"""
+import argparse
+
+import numpy as np
+import tensorflow as tf
+
+from forecaster import (
+    MODEL_VARIANTS, NUM_FEATURES, TIME_STEPS, key_mapping,
+    mean_arr, sensor_feature_columns, std_arr,
+)
+
+def representative_windows(csv_path=None, count=500, seed=0):
+    rng = np.random.default_rng(seed)
+    if csv_path is None:
+        return rng.standard_normal((count, 1, TIME_STEPS, NUM_FEATURES)).astype(np.float32)
+    import pandas as pd
+    df = pd.read_csv(csv_path)
+    # Jena data is recorded every 10 minutes, like the model input
+    data = df[[key_mapping[key] for key in sensor_feature_columns]].to_numpy(np.float32)
+    data = (data - mean_arr) / std_arr
+    starts = rng.integers(0, len(data) - TIME_STEPS, size=count)
+    return np.stack([data[s:s + TIME_STEPS] for s in starts])[:, np.newaxis]
+
+def convert(model, variant, windows):
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if variant == "float16":
+        converter.target_spec.supported_types = [tf.float16]
+    elif variant == "int8":
+        converter.representative_dataset = lambda: ([window] for window in windows)
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        converter.inference_input_type = tf.int8
+        converter.inference_output_type = tf.int8
+    return converter.convert()
+
+def main():
+    parser = argparse.ArgumentParser(description="Export quantized TFLite model variants.")
+    parser.add_argument("--model", default="multi_output_cnn.keras")
+    parser.add_argument("--csv", help="Jena climate CSV for int8 calibration")
+    parser.add_argument("--variants", nargs="+", default=["float16", "int8"])
+    args = parser.parse_args()
+
+    model = tf.keras.models.load_model(args.model)
+    windows = representative_windows(args.csv)
+    for variant in args.variants:
+        with open(MODEL_VARIANTS[variant], "wb") as f:
+            f.write(convert(model, variant, windows))
+        print(f"Saved {variant} model to {MODEL_VARIANTS[variant]}")
+
+if __name__ == "__main__":
+    main()
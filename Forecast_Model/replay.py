@@ -0,0 +1,356 @@
+"""
+Replay and load generator for the full MQTT pipeline.
+
+Publishes sensor readings (with the keys the edge node sends) for many
+simulated stations to a broker, either synthesized or replayed from the Jena
+climate CSV, and measures end-to-end latency:
+
+  sensor publish -> forecast published by inference.py  (MQTT forecast topics)
+  sensor publish -> forecast_update emitted by app.py     (Socket.IO, --socketio)
+
+Readings carry simulated timestamps that run --speedup times faster than
+real time, so every station closes a 10-minute bucket (and gets a forecast)
+every bucket_seconds / speedup wall seconds. --rates sweeps the total message
+rate; each rate is held for --duration seconds and the highest rate at which
+all messages were sent and forecasts kept up is reported as the maximum
+sustainable rate. Results are written as JSON like benchmark.py.
+
+    MQTT_BROKER=localhost MQTT_PORT=1883 python3 inference.py
+    python3 replay.py --stations 50 --rates 100 500 2000 --speedup 600 --output replay.json
+"""
+import argparse
+import csv
+import datetime
+import json
+import math
+import os
+import platform
+import random
+import sys
+import threading
+import time
+
+import numpy as np
+import paho.mqtt.client as mqtt
+
+# Shared modules live in the repository root (common/)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common import payload_codec
+from common.stations import FORECAST_STATION_TOPICS, sensor_topic
+
+from forecaster import TIME_STEPS, key_mapping, sensor_feature_columns
+from resampler import to_epoch
+
+# Must match the resampler settings of inference.py
+RESAMPLE_STEP_SECONDS = int(os.getenv("RESAMPLE_STEP_SECONDS", 600))
+RESAMPLE_LATENESS_SECONDS = int(os.getenv("RESAMPLE_LATENESS_SECONDS", 30))
+
+# Jena climate CSV: one row every 10 minutes
+JENA_ROW_SECONDS = 600
+
+# A rate is sustainable when this share of its messages and expected forecasts got
+# through, with the forecast p99 latency under --max-p99-ms
+SUSTAINABLE_SHARE = 0.95
+
+#############################
+# Reading Sources
+#############################
+
+class SyntheticSource:
+    """
+    Smooth daily cycles plus noise, offset per station, in the value ranges
+    of the training data.
+    """
+
+    def __init__(self, seed=0):
+        self.rng = random.Random(seed)
+
+    def values(self, station_index, timestamp):
+        rng = self.rng
+        day = 2 * math.pi * (timestamp / 86400 + station_index / 17)
+        weather = 2 * math.pi * (timestamp / (3 * 86400) + station_index / 7)
+        return {
+            "air_pressure": round(1010 + 6 * math.sin(weather) + rng.gauss(0, 0.2), 2),
+            "temperature": round(12 + 6 * math.sin(day) + station_index % 5 + rng.gauss(0, 0.3), 2),
+            "humidity": round(min(100.0, max(5.0, 72 - 15 * math.sin(day) + rng.gauss(0, 1))), 2),
+            "wind_speed": round(abs(2.2 + 1.2 * math.sin(weather * 3) + rng.gauss(0, 0.4)), 2),
+        }
+
+class JenaSource:
+    """
+    Replays the Jena climate CSV (the model's training data), renamed to the
+    sensor keys and linearly interpolated between its 10-minute rows. Each
+    station starts at a different row so streams are not identical.
+    """
+
+    def __init__(self, path):
+        columns = [key_mapping[key] for key in sensor_feature_columns]
+        with open(path, newline="") as f:
+            rows = [[float(row[column]) for column in columns] for row in csv.DictReader(f)]
+        if len(rows) < 2:
+            raise ValueError(f"{path}: need at least 2 rows")
+        self.data = np.array(rows)
+        # The raw file logs sensor faults as -9999 wind speed
+        wind = sensor_feature_columns.index("wind_speed")
+        self.data[:, wind] = np.clip(self.data[:, wind], 0, None)
+        self.stride = max(1, len(self.data) // 97)
+
+    def values(self, station_index, timestamp):
+        position = timestamp / JENA_ROW_SECONDS + station_index * self.stride
+        row = int(position) % (len(self.data) - 1)
+        fraction = position - int(position)
+        values = self.data[row] + (self.data[row + 1] - self.data[row]) * fraction
+        return {key: round(float(value), 2) for key, value in zip(sensor_feature_columns, values)}
+
+#############################
+# Latency Tracking
+#############################
+
+class LatencyTracker:
+    """
+    Remembers, per station, which published reading closed each bucket once
+    the model window is full: that reading triggers the forecast whose
+    base_timestamp is the bucket's start. Forecasts seen on MQTT or Socket.IO
+    are matched back to it by (station, base_timestamp).
+    """
+
+    def __init__(self, bucket_seconds, lateness):
+        self.bucket_seconds = bucket_seconds
+        self.lateness = lateness
+        self.lock = threading.Lock()
+        self.first_bucket = {}   # station -> index of its first bucket
+        self.closed = {}         # station -> index of the newest closed bucket
+        self.triggers = {}       # (station, base_timestamp) -> (published_at, step)
+        self.received = {}       # leg -> {(station, base_timestamp): latency}
+        self.expected = {}       # step -> forecasts expected
+
+    def published(self, station, timestamp, published_at, step):
+        # Buckets close once the watermark (newest timestamp - lateness) passes their end
+        closed = math.floor((timestamp - self.lateness) / self.bucket_seconds) - 1
+        with self.lock:
+            first = self.first_bucket.setdefault(station, math.floor(timestamp / self.bucket_seconds))
+            if closed <= self.closed.get(station, first - 1):
+                return
+            self.closed[station] = closed
+            if closed - first + 1 < TIME_STEPS:
+                return
+            # Several buckets closed at once are coalesced by the executor:
+            # only the newest one is sure to get a forecast
+            self.triggers[(station, closed * self.bucket_seconds)] = (published_at, step)
+            self.expected[step] = self.expected.get(step, 0) + 1
+
+    def forecast(self, leg, forecast, received_at):
+        try:
+            key = (forecast.get("station"), to_epoch(forecast["base_timestamp"]))
+        except (KeyError, TypeError, ValueError):
+            return
+        with self.lock:
+            trigger = self.triggers.get(key)
+            latencies = self.received.setdefault(leg, {})
+            if trigger is None or key in latencies:
+                return
+            latencies[key] = received_at - trigger[0]
+
+    def step_results(self, step):
+        with self.lock:
+            expected = self.expected.get(step, 0)
+            results = {}
+            for leg, latencies in self.received.items():
+                samples = [latency for key, latency in latencies.items() if self.triggers[key][1] == step]
+                results[leg] = {
+                    "delivered": len(samples),
+                    "delivery": round(len(samples) / expected, 4) if expected else None,
+                    **summarize(samples),
+                }
+        return expected, results
+
+def summarize(samples):
+    if not samples:
+        return {"p50_ms": None, "p99_ms": None, "mean_ms": None, "max_ms": None}
+    ms = np.asarray(samples) * 1000
+    return {
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "mean_ms": round(float(ms.mean()), 3),
+        "max_ms": round(float(ms.max()), 3),
+    }
+
+#############################
+# Load Generation
+#############################
+
+def connect(host, port, client_id):
+    client = mqtt.Client(client_id=client_id)
+    client.connect(host, port, 60)
+    client.loop_start()
+    return client
+
+def watch_forecasts(host, port, tracker):
+    """
+    Subscribes to the per-station forecast topics on its own connection, so
+    publishing load does not delay the receive timestamps.
+    """
+    def on_message(client, userdata, message):
+        received_at = time.perf_counter()
+        try:
+            forecast = json.loads(message.payload)
+        except (ValueError, UnicodeDecodeError):
+            return
+        tracker.forecast("forecast", forecast, received_at)
+
+    client = mqtt.Client(client_id=f"replay-watch-{os.getpid()}")
+    client.on_message = on_message
+    client.on_connect = lambda client, userdata, flags, rc: client.subscribe(FORECAST_STATION_TOPICS)
+    client.connect(host, port, 60)
+    client.loop_start()
+    return client
+
+def watch_socketio(url, station_ids, tracker):
+    """
+    Joins every station room of the dashboard server and times the
+    forecast_update events (python-socketio client; install websocket-client
+    too, the polling fallback drops busy connections). The dashboard sends
+    each room at most BROADCAST_MAX_RATE updates per second, so at high
+    speed-ups only part of the forecasts is delivered there by design.
+    """
+    import socketio
+
+    sio = socketio.Client()
+
+    @sio.on("forecast_update")
+    def on_forecast(forecast):
+        tracker.forecast("socketio", forecast, time.perf_counter())
+
+    sio.connect(url)
+    for station_id in station_ids:
+        # One join at a time: the polling transport caps packets per request
+        sio.call("join", {"station": station_id})
+    return sio
+
+def publish_step(client, source, station_ids, tracker, step, rate, duration, sim_start,
+                 speedup, encoding):
+    """
+    Publishes round-robin over the stations at `rate` messages per second for
+    `duration` seconds. Simulated time advances `speedup` seconds per wall
+    second of publishing. Returns (messages sent, wall seconds, simulated end).
+    """
+    total = int(rate * duration)
+    started = time.perf_counter()
+    sent = 0
+    for k in range(total):
+        delay = started + k / rate - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        index = k % len(station_ids)
+        timestamp = sim_start + k * speedup / rate
+        reading = {
+            "timestamp": datetime.datetime.fromtimestamp(timestamp).isoformat(),
+            **source.values(index, timestamp),
+        }
+        published_at = time.perf_counter()
+        info = client.publish(sensor_topic(station_ids[index]), payload_codec.encode([reading], encoding))
+        if info.rc != mqtt.MQTT_ERR_SUCCESS:
+            continue
+        sent += 1
+        tracker.published(station_ids[index], timestamp, published_at, step)
+    return sent, time.perf_counter() - started, sim_start + total * speedup / rate
+
+def sustainable(step, max_p99_ms):
+    forecasts = step["legs"].get("forecast", {})
+    return (step["achieved_rate"] >= SUSTAINABLE_SHARE * step["target_rate"]
+            and step["expected_forecasts"] > 0
+            and (forecasts.get("delivery") or 0) >= SUSTAINABLE_SHARE
+            and forecasts["p99_ms"] <= max_p99_ms)
+
+def run(args):
+    source = JenaSource(args.csv) if args.csv else SyntheticSource(args.seed)
+    station_ids = [f"{args.prefix}-{i:04d}" for i in range(args.stations)]
+    tracker = LatencyTracker(args.bucket_seconds, args.lateness)
+
+    watcher = watch_forecasts(args.host, args.port, tracker)
+    sio = watch_socketio(args.socketio, station_ids, tracker) if args.socketio else None
+    client = connect(args.host, args.port, f"replay-{os.getpid()}")
+
+    # Simulated time starts now, so the resampler's wall-clock ticks never
+    # close a bucket before its readings are published
+    sim_time = time.time()
+    # Fill the model windows before measuring: TIME_STEPS buckets per station
+    warmup = (TIME_STEPS + 1) * args.bucket_seconds / args.speedup
+    # Progress goes to stderr: stdout carries only the JSON report
+    print(f"Warming up {len(station_ids)} stations for {warmup:.1f} s...", file=sys.stderr)
+    _, _, sim_time = publish_step(client, source, station_ids, tracker, -1, args.rates[0],
+                                  warmup, sim_time, args.speedup, args.encoding)
+
+    steps = []
+    for step, rate in enumerate(args.rates):
+        interval = args.speedup * len(station_ids) / rate
+        if interval > args.bucket_seconds:
+            print(f"Warning: at {rate} msg/s each station sends one reading per {interval:.0f} "
+                  f"simulated seconds; buckets will be empty (raise --rates or lower --speedup).",
+                  file=sys.stderr)
+        sent, elapsed, sim_time = publish_step(client, source, station_ids, tracker, step, rate,
+                                               args.duration, sim_time, args.speedup, args.encoding)
+        steps.append({"target_rate": rate, "sent": sent, "elapsed_s": round(elapsed, 3),
+                      "achieved_rate": round(sent / elapsed, 1) if elapsed else 0.0})
+        print(f"Sent {sent} messages in {elapsed:.1f} s at {rate} msg/s target.", file=sys.stderr)
+
+    # Let the last forecasts arrive before scoring
+    time.sleep(args.settle)
+    client.loop_stop()
+    watcher.loop_stop()
+    if sio is not None:
+        sio.disconnect()
+
+    max_rate = None
+    for step, entry in enumerate(steps):
+        entry["expected_forecasts"], entry["legs"] = tracker.step_results(step)
+        entry["sustainable"] = sustainable(entry, args.max_p99_ms)
+        if entry["sustainable"]:
+            max_rate = max(max_rate or 0, entry["target_rate"])
+
+    return {
+        "generated_at": datetime.datetime.now().isoformat(),
+        "platform": platform.platform(),
+        "broker": f"{args.host}:{args.port}",
+        "source": args.csv or "synthetic",
+        "stations": len(station_ids),
+        "speedup": args.speedup,
+        "bucket_seconds": args.bucket_seconds,
+        "encoding": args.encoding,
+        "duration_s": args.duration,
+        "steps": steps,
+        "max_sustainable_rate": max_rate,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay sensor streams through the MQTT pipeline and measure latency.")
+    parser.add_argument("--host", default=os.getenv("MQTT_BROKER", "localhost"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("MQTT_PORT", 1883)))
+    parser.add_argument("--csv", help="Jena climate CSV to replay (default: synthetic readings)")
+    parser.add_argument("--stations", type=int, default=10)
+    parser.add_argument("--rates", nargs="+", type=float, default=[50, 200, 1000],
+                        help="total messages per second, one measurement step each")
+    parser.add_argument("--duration", type=float, default=30, help="seconds per rate")
+    parser.add_argument("--speedup", type=float, default=600, help="simulated seconds per wall second")
+    parser.add_argument("--encoding", choices=["json", "binary"], default="json")
+    parser.add_argument("--socketio", help="dashboard URL to time forecast_update emits, e.g. http://localhost:5000")
+    parser.add_argument("--max-p99-ms", type=float, default=1000,
+                        help="highest forecast p99 latency a sustainable rate may have")
+    parser.add_argument("--settle", type=float, default=5, help="seconds to wait for late forecasts")
+    parser.add_argument("--prefix", default=f"replay{int(time.time()) % 100000}",
+                        help="station id prefix; new ids per run keep old windows out of the way")
+    parser.add_argument("--bucket-seconds", type=int, default=RESAMPLE_STEP_SECONDS)
+    parser.add_argument("--lateness", type=int, default=RESAMPLE_LATENESS_SECONDS)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    args = parser.parse_args()
+
+    report = json.dumps(run(args), indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import datetime
+import math
+import threading
+
+import numpy as np
+
+def to_epoch(value):
+    """
+    Converts a reading timestamp (epoch seconds or ISO-8601 string) to epoch seconds.
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+    return datetime.datetime.fromisoformat(value).timestamp()
+
+class BucketResampler:
+    """
+    Streams irregular sensor readings into fixed-width time buckets, so the
+    model sees the 10-minute steps it was trained on instead of raw 2-second
+    readings.
+
+    Each bucket holds the per-feature mean of the readings that fall into it.
+    A bucket is closed once the watermark (newest reading timestamp minus
+    `lateness`) or the wall clock passed to tick() moves past its end; readings
+    that arrive for an already closed bucket are dropped and counted as late.
+    The wall clock only closes the bucket of the newest reading, and only
+    while no readings arrive and that reading is recent: buckets after a
+    station goes quiet stay open, so a backlog the edge spooled during an
+    outage is resampled normally once it arrives.
+
+    Closed buckets are handed to on_bucket(bucket_start, values, filled):
+      - a feature with no readings in the bucket carries its last value forward
+      - up to `max_fill` fully empty buckets are linearly interpolated once
+        data resumes (filled=True)
+      - a longer gap calls on_reset() so stale history is not mixed with new data
+    """
+
+    def __init__(self, features, on_bucket, step=600, lateness=30, max_fill=3, on_reset=None):
+        self.features = list(features)
+        self.on_bucket = on_bucket
+        self.on_reset = on_reset
+        self.step = step
+        self.lateness = lateness
+        self.max_fill = max_fill
+        self.lock = threading.Lock()
+        self.open_buckets = {}      # bucket start -> (sums, counts)
+        self.next_close = None      # start of the oldest bucket not yet closed
+        self.max_timestamp = None
+        self.ticked_timestamp = None  # max_timestamp at the last tick()
+        self.last_values = None     # values of the last emitted bucket
+        self.gap = 0                # empty buckets closed since last_values
+        self.late = 0
+        self.incomplete = 0
+
+    def bucket_start(self, timestamp):
+        return math.floor(timestamp / self.step) * self.step
+
+    def add(self, timestamp, reading):
+        """
+        Adds one reading (a dict keyed by feature name; missing or None values
+        are ignored) and closes any buckets the new watermark has passed.
+        """
+        values = [reading.get(feature) for feature in self.features]
+        with self.lock:
+            start = self.bucket_start(timestamp)
+            if self.next_close is None:
+                self.next_close = start
+            if start < self.next_close:
+                self.late += 1
+                return
+
+            sums, counts = self.open_buckets.setdefault(
+                start, (np.zeros(len(self.features)), np.zeros(len(self.features))))
+            for i, value in enumerate(values):
+                if value is not None:
+                    sums[i] += value
+                    counts[i] += 1
+
+            if self.max_timestamp is None or timestamp > self.max_timestamp:
+                self.max_timestamp = timestamp
+            self._close_until(self.max_timestamp - self.lateness)
+
+    def tick(self, now):
+        """
+        Closes buckets by wall-clock time, for when readings stop arriving.
+        While readings keep arriving, or lag the clock (a backlog being drained),
+        their own watermark closes buckets. Empty buckets after the newest
+        reading are left open; the readings' watermark counts them as a gap
+        once data resumes.
+        """
+        with self.lock:
+            if self.next_close is None:
+                return
+            if self.max_timestamp != self.ticked_timestamp:
+                self.ticked_timestamp = self.max_timestamp
+                return
+            newest_end = self.bucket_start(self.max_timestamp) + self.step
+            if now - newest_end > self.lateness + self.step:
+                return
+            self._close_until(min(now - self.lateness, newest_end))
+
+    def _close_until(self, watermark):
+        while self.next_close + self.step <= watermark:
+            start = self.next_close
+            self.next_close += self.step
+            sums, counts = self.open_buckets.pop(start, (None, None))
+            if counts is None or not counts.any():
+                self.gap += 1
+                continue
+            values = np.divide(sums, counts, out=np.zeros_like(sums), where=counts > 0)
+            if not counts.all():
+                # Carry missing features forward from the previous bucket
+                if self.last_values is None:
+                    self.incomplete += 1
+                    continue
+                values = np.where(counts > 0, values, self.last_values)
+            self._emit(start, values)
+
+    def _emit(self, start, values):
+        if self.gap and self.last_values is not None:
+            if self.gap > self.max_fill:
+                if self.on_reset:
+                    self.on_reset()
+            else:
+                # Linearly interpolate the missing buckets between the last
+                # emitted bucket and this one
+                for i in range(1, self.gap + 1):
+                    fraction = i / (self.gap + 1)
+                    filled = self.last_values + (values - self.last_values) * fraction
+                    self.on_bucket(start - (self.gap + 1 - i) * self.step, filled, True)
+        self.gap = 0
+        self.last_values = values
+        self.on_bucket(start, values, False)
@@ -0,0 +1,28 @@
+"""
+Forecast counting of ForecastEvaluator.
+
+    python3 -m pytest Forecast_Model/test_evaluation.py
+"""
+import numpy as np
+
+from evaluation import ForecastEvaluator
+
+STEP = 600
+
+def test_fully_scored_forecast_counts_once():
+    evaluator = ForecastEvaluator(["t", "h"], steps=24, step_seconds=STEP)
+    evaluator.add_forecast("s", "live", 0, list(range(1, 25)), np.ones((24, 2)))
+    for bucket in range(1, 30):
+        evaluator.observe("s", bucket * STEP, [1.0, 1.0])
+    summary = evaluator.summary()["live"]
+    assert summary["count"] == 1
+    assert summary["mae"] == {"t": 0.0, "h": 0.0}
+
+def test_forecasts_count_from_their_first_published_step():
+    evaluator = ForecastEvaluator(["t"], steps=24, step_seconds=STEP)
+    for base in (0, 1, 2):
+        evaluator.add_forecast("s", "live", base * STEP, [6, 12], np.ones((2, 1)))
+    for bucket in range(1, 8):
+        evaluator.observe("s", bucket * STEP, [2.0])
+    # Bases 0 and 1 reached step 6; base 2 has nothing scored yet
+    assert evaluator.summary()["live"]["count"] == 2
@@ -0,0 +1,64 @@
+"""
+Wall-clock closing and backfill of BucketResampler.
+
+    python3 -m pytest Forecast_Model/test_resampler.py
+"""
+from resampler import BucketResampler
+
+STEP = 600
+LATENESS = 30
+TICK = 5
+
+def make_resampler():
+    closed, resets = [], []
+    resampler = BucketResampler(["t"], lambda start, values, filled: closed.append((start, filled)),
+                                step=STEP, lateness=LATENESS, on_reset=lambda: resets.append(True))
+    return resampler, closed, resets
+
+def feed(resampler, start, end, period=2):
+    # Live readings every `period` seconds, ticking the clock along with them
+    for t in range(start, end + 1, period):
+        resampler.add(t, {"t": 1.0})
+        if t % TICK == 0:
+            resampler.tick(t)
+
+def tick_until(resampler, start, end):
+    for now in range(start, end + 1, TICK):
+        resampler.tick(now)
+
+def test_last_bucket_closes_after_reading_just_past_boundary():
+    resampler, closed, _ = make_resampler()
+    feed(resampler, 0, 602)
+    tick_until(resampler, 603, 603 + 50 * 60)
+    assert [start for start, _ in closed] == [0, STEP]
+
+def test_last_bucket_closes_after_reading_late_in_bucket():
+    resampler, closed, _ = make_resampler()
+    feed(resampler, 0, 1198)
+    tick_until(resampler, 1199, 1199 + 50 * 60)
+    assert [start for start, _ in closed] == [0, STEP]
+
+def test_quiet_station_leaves_empty_buckets_open_for_backlog():
+    resampler, closed, resets = make_resampler()
+    feed(resampler, 0, 3598)
+    # One hour outage: readings are spooled on the edge, the clock keeps ticking
+    tick_until(resampler, 3600, 7200)
+    # The backlog drains quickly, then live readings resume
+    for t in range(3600, 7200, 2):
+        resampler.add(t, {"t": 2.0})
+        if t % 200 == 0:
+            resampler.tick(7200)
+    feed(resampler, 7200, 9000)
+    starts = [start for start, _ in closed]
+    assert resampler.late == 0
+    assert not resets
+    assert not any(filled for _, filled in closed)
+    assert starts == list(range(0, starts[-1] + STEP, STEP))
+
+def test_outage_without_backlog_still_resets():
+    resampler, closed, resets = make_resampler()
+    feed(resampler, 0, 3598)
+    tick_until(resampler, 3600, 7200)
+    feed(resampler, 7200, 9000)
+    assert resets == [True]
+    assert resampler.late == 0
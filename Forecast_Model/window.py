@@ -0,0 +1,52 @@
+import numpy as np
+
+class SensorWindow:
+    """
+    Fixed-size sliding window of normalized sensor readings, ready to be fed
+    to the model as a (1, time_steps, num_features) tensor.
+
+    The window is backed by a preallocated (2 * time_steps, num_features)
+    float32 array. Every reading is normalized once and written twice,
+    time_steps rows apart, so the latest time_steps rows are always one
+    contiguous slice: appending is O(1) and reading the window never copies.
+    """
+
+    def __init__(self, time_steps, mean, std):
+        self.time_steps = time_steps
+        self.mean = np.asarray(mean, dtype=np.float32)
+        self.inv_std = (1.0 / np.asarray(std, dtype=np.float32)).astype(np.float32)
+        self.buffer = np.zeros((2 * time_steps, len(self.mean)), dtype=np.float32)
+        self.pos = 0
+        self.count = 0
+        self.last_timestamp = None
+
+    def append(self, values, timestamp=None):
+        """
+        Normalizes one reading (ordered like the model features) and writes it
+        in place, overwriting the oldest reading once the window is full.
+        """
+        row = self.buffer[self.pos]
+        row[:] = values
+        row -= self.mean
+        row *= self.inv_std
+        self.buffer[self.pos + self.time_steps] = row
+        self.pos = (self.pos + 1) % self.time_steps
+        self.count = min(self.count + 1, self.time_steps)
+        self.last_timestamp = timestamp
+
+    @property
+    def full(self):
+        return self.count == self.time_steps
+
+    def clear(self):
+        self.pos = 0
+        self.count = 0
+        self.last_timestamp = None
+
+    def view(self):
+        """
+        Returns the window in chronological order with shape
+        (1, time_steps, num_features). This is a view into the ring buffer:
+        copy it if it must outlive the next append.
+        """
+        return self.buffer[self.pos:self.pos + self.time_steps][np.newaxis]
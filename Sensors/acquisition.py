@@ -0,0 +1,140 @@
+import datetime
+import logging
+import math
+import threading
+import time
+
+from prometheus_client import Counter, Histogram
+
+log = logging.getLogger(__name__)
+
+READ_SECONDS = Histogram("sensor_read_seconds", "Duration of one sensor read", ["sensor"],
+                         buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5))
+READ_FAILURES = Counter("sensor_read_failures_total", "Failed sensor reads", ["sensor"])
+SNAPSHOTS = Counter("sensor_snapshots_total", "Combined snapshots taken")
+SNAPSHOT_ERRORS = Counter("sensor_snapshot_errors_total", "Snapshots that failed to publish")
+
+class LatestValues:
+    """
+    Thread-safe table of the latest value of every sensor field and the
+    time it was read.
+    """
+
+    def __init__(self, fields):
+        self.fields = list(fields)
+        self.lock = threading.Lock()
+        self.values = {field: None for field in self.fields}
+        self.read_at = {field: None for field in self.fields}
+
+    def update(self, values, read_at=None):
+        # None means the sensor had nothing valid this time: keep the last value
+        read_at = time.time() if read_at is None else read_at
+        with self.lock:
+            for field, value in values.items():
+                if value is not None:
+                    self.values[field] = value
+                    self.read_at[field] = read_at
+
+    def snapshot(self, now):
+        """
+        Returns (values, staleness): staleness is the age in seconds of each
+        field's value at `now`, or None if the field was never read.
+        """
+        with self.lock:
+            values = dict(self.values)
+            staleness = {
+                field: None if read_at is None else round(max(now - read_at, 0.0), 2)
+                for field, read_at in self.read_at.items()
+            }
+        return values, staleness
+
+# Back-to-back readers (period 0) wait this long after a failed read, doubling
+# per consecutive failure up to the maximum, so a dead device cannot spin a core
+FAILURE_BACKOFF_MIN = 0.1
+FAILURE_BACKOFF_MAX = 2.0
+
+class SensorReader(threading.Thread):
+    """
+    Polls one sensor on its own thread at its own rate, so a slow or failing
+    sensor never delays the others.
+
+    read() returns a dict of field values and may raise on a failed read
+    (common with the DHT22); failures are counted and retried next period.
+    A period of 0 calls read() back to back, for sources that block until
+    data arrives (e.g. serial readline with a timeout); after a failure it
+    backs off between FAILURE_BACKOFF_MIN and FAILURE_BACKOFF_MAX seconds.
+    """
+
+    def __init__(self, name, read, period, table):
+        super().__init__(name=name, daemon=True)
+        self.read = read
+        self.period = period
+        self.table = table
+        self.reads = 0
+        self.failures = 0
+        self.last_error = None
+
+    def run(self):
+        next_read = time.monotonic()
+        read_seconds = READ_SECONDS.labels(self.name)
+        backoff = 0.0
+        while True:
+            started = time.perf_counter()
+            try:
+                values = self.read()
+                if values:
+                    self.table.update(values)
+                self.reads += 1
+                backoff = 0.0
+            except Exception as e:
+                self.failures += 1
+                self.last_error = str(e)
+                READ_FAILURES.labels(self.name).inc()
+                log.debug("%s read failed: %s", self.name, e)
+                backoff = min(max(backoff * 2, FAILURE_BACKOFF_MIN), FAILURE_BACKOFF_MAX)
+            read_seconds.observe(time.perf_counter() - started)
+            if self.period <= 0:
+                if backoff:
+                    time.sleep(backoff)
+                continue
+            # Schedule from the planned time, not from when the read finished,
+            # skipping missed slots if a read overran its period
+            next_read += self.period
+            now = time.monotonic()
+            if next_read < now:
+                next_read = now + self.period - ((now - next_read) % self.period)
+            time.sleep(next_read - now)
+
+class SnapshotScheduler:
+    """
+    Publishes a combined snapshot of the latest values on exact multiples of
+    `period` seconds of wall-clock time. Each wait is computed from the next
+    boundary rather than a fixed sleep, so the sample period does not drift.
+
+    Snapshots carry the edge timestamp of their boundary and the staleness of
+    every field.
+    """
+
+    def __init__(self, table, period, publish):
+        self.table = table
+        self.period = period
+        self.publish = publish
+        self.published = 0
+
+    def run(self):
+        while True:
+            boundary = (math.floor(time.time() / self.period) + 1) * self.period
+            time.sleep(max(boundary - time.time(), 0.0))
+            values, staleness = self.table.snapshot(boundary)
+            payload = {
+                "timestamp": datetime.datetime.fromtimestamp(boundary).isoformat(),
+                **values,
+                "staleness": staleness,
+            }
+            SNAPSHOTS.inc()
+            try:
+                self.publish(payload)
+                self.published += 1
+            except Exception as e:
+                SNAPSHOT_ERRORS.inc()
+                log.error("Error publishing snapshot: %s", e)
@@ -1,4 +1,3 @@
-import time
 import board
 import busio
 import adafruit_bmp280
@@ -6,7 +5,22 @@ import adafruit_dht
 import serial
 import paho.mqtt.client as mqtt
 import json
+import logging
 import os
+import sys
+import time
+from prometheus_client import Counter, Gauge
+
+# Shared modules live in the repository root (common/)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common import metrics
+
+from acquisition import LatestValues, SensorReader, SnapshotScheduler
+from filters import EdgeFilter, Smoother, in_range
+from spool import ForwardingPublisher, Spool
+
+metrics.configure_logging()
+log = logging.getLogger("combined_sensors")
 
 # Define sensor types and GPIO pins
 SENSOR_BMP = adafruit_bmp280.Adafruit_BMP280_I2C(busio.I2C(board.SCL, board.SDA), address=0x76)
@@ -17,6 +31,52 @@ ser = serial.Serial('/dev/ttyACM0', 115200, timeout=1)  # For Anemometer
 A = 26.43  # Scaling factor from the extracted graph
 B = -5.67  # Offset
 
+# Sampling configuration (seconds)
+PUBLISH_PERIOD = float(os.getenv("PUBLISH_PERIOD", 2))   # Combined snapshot every 2 seconds
+BMP_PERIOD = float(os.getenv("BMP_PERIOD", 1))
+DHT_PERIOD = float(os.getenv("DHT_PERIOD", 2))           # DHT22 cannot be read faster than every 2 s
+
+# Batched publishing: send up to PUBLISH_BATCH_SIZE readings (or PUBLISH_BATCH_SECONDS
+# worth) per message, encoded as "json" or compact "binary". A size of 1 publishes
+# every reading as a plain JSON object, as before.
+PUBLISH_BATCH_SIZE = int(os.getenv("PUBLISH_BATCH_SIZE", 1))
+PUBLISH_BATCH_SECONDS = float(os.getenv("PUBLISH_BATCH_SECONDS", 30))
+PUBLISH_ENCODING = os.getenv("PUBLISH_ENCODING", "json")
+
+# Store-and-forward: readings taken while the broker is unreachable are kept in
+# an on-disk spool (bounded to SPOOL_MAX_READINGS, oldest dropped first) and
+# forwarded after reconnection, SPOOL_DRAIN_BATCH readings per message at most
+# SPOOL_DRAIN_RATE messages per second
+SPOOL_PATH = os.getenv("SPOOL_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "sensor_spool.db"))
+SPOOL_MAX_READINGS = int(os.getenv("SPOOL_MAX_READINGS", 200000))  # ~4.6 days at one reading per 2 s
+SPOOL_DRAIN_BATCH = int(os.getenv("SPOOL_DRAIN_BATCH", 100))
+SPOOL_DRAIN_RATE = float(os.getenv("SPOOL_DRAIN_RATE", 5))
+
+# Edge filtering: readings outside VALID_RANGES are rejected and replaced by the
+# last good value (flagged "held"); a field is only published when it moves by
+# more than its DEADBANDS threshold, or at least every FILTER_HEARTBEAT seconds.
+# FILTER_ENABLED=0 publishes every snapshot unfiltered, as before.
+FILTER_ENABLED = os.getenv("FILTER_ENABLED", "1") == "1"
+FILTER_HEARTBEAT = float(os.getenv("FILTER_HEARTBEAT", 60))
+VALID_RANGES = {
+    "temperature": (-40.0, 80.0),      # DHT22 operating range (C)
+    "wind_speed": (0.0, 60.0),         # m/s
+    "air_pressure": (300.0, 1100.0),   # BMP280 operating range (hPa)
+    "humidity": (0.0, 100.0),          # %
+}
+DEADBANDS = {
+    "temperature": float(os.getenv("DEADBAND_TEMPERATURE", 0.1)),
+    "wind_speed": float(os.getenv("DEADBAND_WIND_SPEED", 0.2)),
+    "air_pressure": float(os.getenv("DEADBAND_AIR_PRESSURE", 0.05)),
+    "humidity": float(os.getenv("DEADBAND_HUMIDITY", 0.5)),
+}
+# Anemometer smoothing: median of the last WIND_MEDIAN_WINDOW samples, then an EMA
+WIND_MEDIAN_WINDOW = int(os.getenv("WIND_MEDIAN_WINDOW", 5))
+WIND_EMA_ALPHA = float(os.getenv("WIND_EMA_ALPHA", 0.3))
+
+# Prometheus metrics are served on this port at /metrics (0 disables)
+METRICS_PORT = int(os.getenv("METRICS_PORT", 9101))
+
 # MQTT Configuration
 mqtt_broker = os.getenv("MQTT_BROKER")  # MQTT Broker address (localhost for local testing)
 mqtt_port = int(os.getenv("MQTT_PORT"))           # Default MQTT port
@@ -28,46 +88,79 @@ mqtt_topic = "sensor/data"  # Topic to publish data
 # Create MQTT client
 client = mqtt.Client()
 
-# Connect to MQTT broker
-client.connect(mqtt_broker, mqtt_port, 60)
+# Connect to MQTT broker (in the background, so the node also starts while offline;
+# paho keeps reconnecting after the connection drops)
+client.connect_async(mqtt_broker, mqtt_port, 60)
 
 # Start the MQTT loop in the background
 client.loop_start()
 
 # Set BMP280 sea level pressure (adjust based on your location)
 SENSOR_BMP.sea_level_pressure = 1013.25  # Standard sea-level pressure in hPa
-wind_speed=0
-while True:
-    try:
-        # Read from BMP280 (air pressure)
-        air_pressure = SENSOR_BMP.pressure
-
-        # Read from DHT22 (temperature, humidity)
-        temperature = SENSOR_DHT.temperature
-        humidity = SENSOR_DHT.humidity
-
-        # Read from Anemometer (wind speed)
-        line = ser.readline().decode('utf-8').strip()  # Read & decode data
-        if line:
-            voltage = float(line)  # Convert to float
-            wind_speed = A * voltage + B  # Convert voltage to wind speed
-            wind_speed = max(wind_speed, 0)  # Ensure no negative wind speed
-
-        # Create a combined JSON payload
-        payload = {
-            "temperature": temperature,
-            "wind_speed": round(wind_speed, 2),
-            "air_pressure": round(air_pressure, 2),
-            "humidity": humidity,
-        }
-
-        # Print the combined data for debugging
-        print(json.dumps(payload, indent=4))
-
-        # Publish the combined data to the MQTT topic
-        client.publish(mqtt_topic, json.dumps(payload))
-
-    except Exception as e:
-        print(f"Error: {e}")
-
-    time.sleep(2)  # Wait 2 seconds before the next reading
+
+#############################
+# Sensor Readers
+#############################
+def read_bmp280():
+    # Read from BMP280 (air pressure)
+    return {"air_pressure": round(SENSOR_BMP.pressure, 2)}
+
+def read_dht22():
+    # Read from DHT22 (temperature, humidity); raises RuntimeError on a failed read
+    return {"temperature": SENSOR_DHT.temperature, "humidity": SENSOR_DHT.humidity}
+
+def read_anemometer():
+    # Read from Anemometer (wind speed); blocks for up to the serial timeout
+    line = ser.readline().decode('utf-8').strip()  # Read & decode data
+    if not line:
+        return None
+    voltage = float(line)  # Convert to float
+    wind_speed = A * voltage + B  # Convert voltage to wind speed
+    wind_speed = max(wind_speed, 0)  # Ensure no negative wind speed
+    if not in_range(wind_speed, VALID_RANGES["wind_speed"]):
+        return None  # Spike from a corrupted serial line: keep the last value
+    return {"wind_speed": round(wind_smoother.update(wind_speed), 2)}
+
+wind_smoother = Smoother(WIND_MEDIAN_WINDOW, WIND_EMA_ALPHA)
+edge_filter = EdgeFilter(VALID_RANGES, DEADBANDS, FILTER_HEARTBEAT)
+
+SNAPSHOTS_SUPPRESSED = Counter("edge_snapshots_suppressed_total", "Snapshots with no field outside its deadband")
+Gauge("edge_values_rejected", "Readings rejected by the range checks").set_function(lambda: edge_filter.rejected)
+
+# Publishes at QoS 1 while connected, spools to disk while not
+forwarder = ForwardingPublisher(
+    client, mqtt_topic, Spool(SPOOL_PATH, SPOOL_MAX_READINGS),
+    batch_size=PUBLISH_BATCH_SIZE,
+    batch_seconds=PUBLISH_BATCH_SECONDS,
+    encoding=PUBLISH_ENCODING,
+    drain_batch=SPOOL_DRAIN_BATCH,
+    drain_rate=SPOOL_DRAIN_RATE,
+)
+forwarder.start()
+
+def publish(payload):
+    # Validate and drop fields that have not changed; skip the message if none did
+    if FILTER_ENABLED:
+        payload = edge_filter.process(payload, time.time())
+        if payload is None:
+            SNAPSHOTS_SUPPRESSED.inc()
+            return
+
+    log.debug("Publishing %s", json.dumps(payload))
+
+    # Publish the combined data to the MQTT topic (or spool it while offline)
+    forwarder.publish(payload)
+
+latest = LatestValues(["temperature", "wind_speed", "air_pressure", "humidity"])
+readers = [
+    SensorReader("bmp280", read_bmp280, BMP_PERIOD, latest),
+    SensorReader("dht22", read_dht22, DHT_PERIOD, latest),
+    SensorReader("anemometer", read_anemometer, 0, latest),
+]
+for reader in readers:
+    reader.start()
+
+metrics.serve(METRICS_PORT)
+
+# Publish a combined, edge-timestamped snapshot on every period boundary
+SnapshotScheduler(latest, PUBLISH_PERIOD, publish).run()
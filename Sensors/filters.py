@@ -0,0 +1,94 @@
+import collections
+import statistics
+
+# Per-field quality flags published alongside the values
+QUALITY_OK = "ok"            # fresh value that passed the range check
+QUALITY_HELD = "held"        # invalid or missing reading replaced by the last good value
+QUALITY_MISSING = "missing"  # no good value has been seen yet
+
+class Smoother:
+    """
+    Median-of-N followed by an exponential moving average. The median removes
+    single-sample spikes (e.g. serial glitches in the anemometer voltage), the
+    EMA smooths the remaining noise.
+    """
+
+    def __init__(self, window=5, alpha=0.3):
+        self.samples = collections.deque(maxlen=window)
+        self.alpha = alpha
+        self.value = None
+
+    def update(self, sample):
+        self.samples.append(sample)
+        median = statistics.median(self.samples)
+        if self.value is None:
+            self.value = median
+        else:
+            self.value += self.alpha * (median - self.value)
+        return self.value
+
+def in_range(value, limits):
+    return value is not None and limits[0] <= value <= limits[1]
+
+class EdgeFilter:
+    """
+    Validates combined snapshots and reduces them to the fields worth sending.
+
+      - values outside `ranges` (or None) are replaced by the field's last good
+        value and flagged "held"; before any good value they are "missing"
+      - a field is only published when it moved by more than its `deadbands`
+        threshold, its quality changed, or `heartbeat` seconds have passed
+        since it was last sent
+
+    process() returns the reduced payload with a "quality" entry per published
+    field, or None when nothing needs to be sent.
+    """
+
+    def __init__(self, ranges, deadbands, heartbeat=60.0):
+        self.ranges = ranges
+        self.deadbands = deadbands
+        self.heartbeat = heartbeat
+        self.last_good = {}
+        self.last_sent = {}     # field -> (value, quality, sent_at)
+        self.suppressed = 0
+        self.rejected = 0
+
+    def process(self, snapshot, now):
+        payload = {}
+        quality = {}
+        staleness = snapshot.get("staleness") or {}
+        for field, limits in self.ranges.items():
+            value = snapshot.get(field)
+            if in_range(value, limits):
+                self.last_good[field] = value
+                flag = QUALITY_OK
+            else:
+                if value is not None:
+                    self.rejected += 1
+                value = self.last_good.get(field)
+                flag = QUALITY_HELD if value is not None else QUALITY_MISSING
+
+            if not self._changed(field, value, flag, now):
+                continue
+            self.last_sent[field] = (value, flag, now)
+            payload[field] = value
+            quality[field] = flag
+
+        if not payload:
+            self.suppressed += 1
+            return None
+        result = {"timestamp": snapshot["timestamp"], **payload, "quality": quality}
+        if staleness:
+            result["staleness"] = {field: staleness.get(field) for field in payload}
+        return result
+
+    def _changed(self, field, value, flag, now):
+        previous = self.last_sent.get(field)
+        if previous is None:
+            return True
+        last_value, last_flag, sent_at = previous
+        if flag != last_flag or now - sent_at >= self.heartbeat:
+            return True
+        if value is None or last_value is None:
+            return value != last_value
+        return abs(value - last_value) > self.deadbands.get(field, 0.0)
@@ -0,0 +1,189 @@
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+import paho.mqtt.client as mqtt
+from prometheus_client import Counter, Gauge
+
+if __name__ == "__main__":
+    # Run stand-alone: make the shared common/ package importable (entry
+    # points such as combined_sensors.py do this before importing spool)
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.payload_codec import Batcher, encode
+
+log = logging.getLogger(__name__)
+
+READINGS_PUBLISHED = Counter("edge_readings_published_total", "Readings published live")
+READINGS_SPOOLED = Counter("edge_readings_spooled_total", "Readings written to the spool")
+READINGS_DRAINED = Counter("edge_readings_drained_total", "Spooled readings forwarded after reconnecting")
+READINGS_DROPPED = Counter("edge_spool_dropped_total", "Oldest spooled readings dropped when the spool was full")
+PUBLISH_FAILURES = Counter("edge_publish_failures_total", "MQTT publish calls that failed")
+SPOOL_DEPTH = Gauge("edge_spool_depth", "Readings waiting in the spool")
+
+class Spool:
+    """
+    Bounded, append-only on-disk queue of readings backed by SQLite (WAL mode,
+    so appends survive power loss on the SD card). Readings come back out in
+    timestamp order; once `max_readings` is reached the oldest are dropped.
+    """
+
+    def __init__(self, path, max_readings=200000):
+        self.max_readings = max_readings
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS readings ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " ts TEXT NOT NULL,"
+            " payload TEXT NOT NULL)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS readings_ts ON readings (ts, id)")
+        self.conn.commit()
+        self.count = self.conn.execute("SELECT COUNT(*) FROM readings").fetchone()[0]
+        self.dropped = 0
+
+    def __len__(self):
+        with self.lock:
+            return self.count
+
+    def extend(self, readings):
+        with self.lock:
+            self.conn.executemany(
+                "INSERT INTO readings (ts, payload) VALUES (?, ?)",
+                [(str(reading.get("timestamp", "")), json.dumps(reading)) for reading in readings])
+            self.count += len(readings)
+            READINGS_SPOOLED.inc(len(readings))
+            overflow = self.count - self.max_readings
+            if overflow > 0:
+                # Ring behaviour: the oldest readings make room for new ones
+                self.conn.execute(
+                    "DELETE FROM readings WHERE id IN"
+                    " (SELECT id FROM readings ORDER BY ts, id LIMIT ?)", (overflow,))
+                self.count -= overflow
+                self.dropped += overflow
+                READINGS_DROPPED.inc(overflow)
+            self.conn.commit()
+
+    def append(self, reading):
+        self.extend([reading])
+
+    def peek(self, limit):
+        """
+        Returns up to `limit` of the oldest readings as (ids, readings).
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT id, payload FROM readings ORDER BY ts, id LIMIT ?", (limit,)).fetchall()
+        return [row[0] for row in rows], [json.loads(row[1]) for row in rows]
+
+    def remove(self, ids):
+        with self.lock:
+            self.conn.executemany("DELETE FROM readings WHERE id = ?", [(i,) for i in ids])
+            self.conn.commit()
+            self.count -= len(ids)
+
+class ForwardingPublisher:
+    """
+    Publishes readings at QoS 1 while the broker is reachable and spools them
+    to disk while it is not. After a reconnect the backlog is drained in
+    timestamp order, `drain_batch` readings per message and at most
+    `drain_rate` messages per second, so it does not flood the broker.
+    While a backlog exists new readings are spooled behind it to keep order.
+    """
+
+    def __init__(self, client, topic, spool, batch_size=1, batch_seconds=30.0,
+                 encoding="json", drain_batch=100, drain_rate=5.0, qos=1, confirm_timeout=10.0):
+        self.client = client
+        self.topic = topic
+        self.spool = spool
+        self.encoding = encoding
+        self.drain_batch = drain_batch
+        self.drain_rate = drain_rate
+        self.qos = qos
+        self.confirm_timeout = confirm_timeout
+        self.lock = threading.Lock()
+        self.batcher = Batcher(self._send_live, batch_size, batch_seconds, encoding)
+        self.published = 0
+        self.drained = 0
+        self.drain_thread = threading.Thread(target=self._drain, name="spool-drain", daemon=True)
+        SPOOL_DEPTH.set_function(lambda: len(self.spool))
+
+    def start(self):
+        self.drain_thread.start()
+
+    def publish(self, reading):
+        with self.lock:
+            if self.client.is_connected() and not len(self.spool):
+                self.batcher.add(reading)
+            else:
+                self.batcher.flush()
+                self.spool.append(reading)
+
+    def _send_live(self, message, readings):
+        # Never hand messages to paho while offline: its in-memory queue is
+        # unbounded and lost on restart, the spool is neither
+        if not self.client.is_connected():
+            self.spool.extend(readings)
+            return
+        info = self.client.publish(self.topic, message, qos=self.qos)
+        if info.rc != mqtt.MQTT_ERR_SUCCESS:
+            PUBLISH_FAILURES.inc()
+            log.warning("Publish failed (rc=%d); spooling %d readings.", info.rc, len(readings))
+            self.spool.extend(readings)
+        else:
+            self.published += len(readings)
+            READINGS_PUBLISHED.inc(len(readings))
+
+    def _drain(self):
+        interval = 1.0 / self.drain_rate if self.drain_rate > 0 else 0.0
+        while True:
+            if not self.client.is_connected() or not len(self.spool):
+                time.sleep(1.0)
+                continue
+            ids, readings = self.spool.peek(self.drain_batch)
+            info = self.client.publish(self.topic, encode(readings, self.encoding), qos=self.qos)
+            try:
+                # Only drop readings from the spool once the broker acknowledged them
+                info.wait_for_publish(self.confirm_timeout)
+            except (RuntimeError, ValueError):
+                pass
+            if info.is_published():
+                self.spool.remove(ids)
+                self.drained += len(ids)
+                READINGS_DRAINED.inc(len(ids))
+                if not len(self.spool):
+                    log.info("Spool drained (%d readings forwarded so far).", self.drained)
+            else:
+                PUBLISH_FAILURES.inc()
+                time.sleep(1.0)
+            time.sleep(interval)
+
+if __name__ == "__main__":
+    # Stand-alone check against a local broker (e.g. `mosquitto -p 1883`):
+    # publishes a synthetic reading every second; stop and restart the broker
+    # to watch readings spool up and drain in order after reconnection.
+    #   MQTT_BROKER=localhost MQTT_PORT=1883 python3 Sensors/spool.py
+    import datetime
+    import random
+
+    client = mqtt.Client()
+    client.connect_async(os.getenv("MQTT_BROKER", "localhost"), int(os.getenv("MQTT_PORT", 1883)), 60)
+    client.loop_start()
+    forwarder = ForwardingPublisher(client, "sensor/data", Spool(os.getenv("SPOOL_PATH", "spool_test.db")))
+    forwarder.start()
+    while True:
+        forwarder.publish({
+            "timestamp": datetime.datetime.now().isoformat(),
+            "temperature": round(random.uniform(25, 32), 2),
+            "wind_speed": round(random.uniform(0, 5), 2),
+            "air_pressure": round(random.uniform(1005, 1012), 2),
+            "humidity": round(random.uniform(60, 90), 2),
+        })
+        print(f"connected={client.is_connected()} spooled={len(forwarder.spool)} "
+              f"published={forwarder.published} drained={forwarder.drained}")
+        time.sleep(1)
@@ -1,11 +1,43 @@
+import os
+
+# Socket.IO server: "eventlet" or "gevent" serve many concurrent dashboards on
+# green threads (the standard library must be patched before anything else
+# imports it); unset uses plain threads
+SOCKETIO_ASYNC_MODE = os.getenv("SOCKETIO_ASYNC_MODE") or None
+if SOCKETIO_ASYNC_MODE == "eventlet":
+    import eventlet
+    eventlet.monkey_patch()
+elif SOCKETIO_ASYNC_MODE == "gevent":
+    from gevent import monkey
+    monkey.patch_all()
+
 import requests
 import json
+import logging
 import redis
 import datetime
-import os
-from flask import Flask, jsonify, render_template
+import sys
+import time
+from flask import Flask, Response, g, jsonify, render_template, request, stream_with_context
 from flask_mqtt import Mqtt
-from flask_socketio import SocketIO
+from flask_socketio import SocketIO, emit, join_room
+from prometheus_client import Counter, Gauge, Histogram
+
+# Shared modules live in the repository root (common/)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common import metrics, payload_codec, stations
+from common.stations import DEFAULT_STATION
+
+import archive
+import history_store
+import response_cache
+import rollups
+import safety
+from broadcast import Broadcaster
+from ingest_buffer import IngestBuffer
+
+metrics.configure_logging()
+log = logging.getLogger("app")
 
 app = Flask(__name__)
 
@@ -16,19 +48,86 @@ redis_db = 0
 
 # Connect to Redis
 r = redis.Redis(host=redis_host, port=redis_port, db=redis_db, decode_responses=True)
+rollups.register(r)
+
+# Rendered /data responses, reused until the ingest path bumps the data version
+cache = response_cache.ResponseCache(
+    r,
+    max_entries=int(os.getenv("RESPONSE_CACHE_ENTRIES", 256)),
+    max_age=int(os.getenv("RESPONSE_MAX_AGE", 0)),
+)
 
 # Configure MQTT to use localhost
 app.config['MQTT_BROKER_URL'] = os.getenv("MQTT_BROKER")
 app.config['MQTT_BROKER_PORT'] = int(os.getenv("MQTT_PORT"))  # Default MQTT port
 app.config['MQTT_USERNAME'] = os.getenv("MQTT_USER")           # MQTT username
 app.config['MQTT_PASSWORD'] = os.getenv("MQTT_PASSWORD")   # MQTT password
-app.config['MQTT_TLS_ENABLED'] = True
-app.config['MQTT_TLS_CA_CERTS'] = "/home/team1/INF2009_GROUP1/ca.crt"  # Path to CA certificate
+# MQTT_TLS=0 connects to a plain local broker (e.g. for Forecast_Model/replay.py)
+app.config['MQTT_TLS_ENABLED'] = os.getenv("MQTT_TLS", "1") == "1"
+app.config['MQTT_TLS_CA_CERTS'] = os.getenv("MQTT_CA_CERTS", "/home/team1/INF2009_GROUP1/ca.crt")  # Path to CA certificate
 app.config['MQTT_KEEPALIVE'] = 60
-app.config['MQTT_TOPIC'] = "sensor/data"  # Primary sensor topic
+app.config['MQTT_TOPIC'] = stations.SENSOR_TOPIC  # Primary sensor topic
+
+# Redis URL (e.g. redis://localhost:6379/0) shared by several server processes,
+# so an update emitted by one reaches the clients connected to all of them
+SOCKETIO_MESSAGE_QUEUE = os.getenv("SOCKETIO_MESSAGE_QUEUE") or None
+# Maximum Socket.IO updates per second per station room and event (must be > 0)
+BROADCAST_MAX_RATE = float(os.getenv("BROADCAST_MAX_RATE", 1))
+# Only one process should consume MQTT; set to 0 on extra processes that only serve dashboards
+INGEST_ENABLED = os.getenv("INGEST_ENABLED", "1") == "1"
+WEB_PORT = int(os.getenv("WEB_PORT", 5000))
+# Recent history included in /api/snapshot, as 10-minute rollups
+SNAPSHOT_HISTORY_SECONDS = int(os.getenv("SNAPSHOT_HISTORY_SECONDS", 6 * 3600))
+SNAPSHOT_HISTORY_RESOLUTION = "10m"
 
 mqtt = Mqtt()
-socketio = SocketIO(app, cors_allowed_origins="*")
+socketio = SocketIO(app, cors_allowed_origins="*",
+                    async_mode=SOCKETIO_ASYNC_MODE,
+                    message_queue=SOCKETIO_MESSAGE_QUEUE)
+
+#############################
+# Metrics
+#############################
+# Scraped from /metrics. Each server process keeps its own counters, so with
+# several workers every process is a separate scrape target.
+INGEST_MESSAGES = Counter("dashboard_ingest_messages_total", "MQTT messages stored, by kind", ["kind"])
+INGEST_ERRORS = Counter("dashboard_ingest_decode_errors_total", "MQTT messages that could not be decoded")
+INGEST_BATCH_SIZE = Histogram("dashboard_ingest_batch_size", "Messages per ingest batch",
+                              buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500))
+REDIS_WRITE_SECONDS = Histogram("dashboard_redis_write_seconds", "Time to execute one ingest pipeline",
+                                buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0))
+BROADCAST_FLUSH_SECONDS = Histogram("dashboard_broadcast_flush_seconds", "Time to emit one round of Socket.IO updates",
+                                    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0))
+BROADCAST_EMITS = Counter("dashboard_broadcast_emits_total", "Socket.IO room updates sent")
+REQUEST_SECONDS = Histogram("dashboard_request_seconds", "HTTP request handling time", ["endpoint", "status"],
+                            buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0))
+
+def record_broadcast(seconds, emitted):
+    BROADCAST_FLUSH_SECONDS.observe(seconds)
+    BROADCAST_EMITS.inc(emitted)
+
+broadcaster = Broadcaster(socketio, max_rate=BROADCAST_MAX_RATE, on_flush=record_broadcast)
+
+# Latest values and forecast of each station (legacy keys for the default station).
+# History and rollups are kept for the default station.
+def latest_key(station):
+    return "sensor_data" if station == DEFAULT_STATION else f"sensor_data:{station}"
+
+def forecast_key(station):
+    return "forecast_data" if station == DEFAULT_STATION else f"forecast_data:{station}"
+
+# Latest online forecast accuracy summary (see Forecast_Model/evaluation.py)
+EVALUATION_KEY = "forecast_evaluation"
+
+def decode_latest(values):
+    # Redis hashes hold strings: restore the numeric fields
+    decoded = {}
+    for field, value in values.items():
+        try:
+            decoded[field] = float(value)
+        except ValueError:
+            decoded[field] = value
+    return decoded
 
 # Default route
 @app.route('/')
@@ -38,53 +137,323 @@ def home():
 # MQTT Message Handling
 @mqtt.on_connect()
 def handle_connect(client, userdata, flags, rc):
-    print("Connected to MQTT Broker!")
-    # Subscribe to both topics
+    log.info("Connected to MQTT Broker!")
+    # Subscribe to sensor readings and forecasts, legacy and per-station topics
     mqtt.subscribe(app.config['MQTT_TOPIC'])
-    mqtt.subscribe("forecast/data")
+    mqtt.subscribe(stations.SENSOR_STATION_TOPICS)
+    mqtt.subscribe(stations.FORECAST_TOPIC)
+    mqtt.subscribe(stations.FORECAST_STATION_TOPICS)
+    mqtt.subscribe(stations.EVALUATION_TOPIC)
+
+def write_batch(batch):
+    """
+    Flush callback of the ingest buffer: decodes a batch of MQTT messages,
+    writes them to Redis in one pipelined transaction, then hands the
+    Socket.IO updates to the broadcaster once the data is stored.
+    """
+    latest = {}       # station -> latest values
+    sensor_updates = []
+    forecasts = {}    # station -> newest forecast
+    evaluation = None
+    pipe = r.pipeline(transaction=True)
+    for topic, payload, received_at in batch:
+        # A message that fails in any way is skipped; it never aborts the batch
+        try:
+            if stations.is_sensor_topic(topic):
+                # Process sensor data: a single reading or a batch from the edge
+                try:
+                    readings = payload_codec.decode(payload)
+                except (ValueError, UnicodeDecodeError) as e:
+                    INGEST_ERRORS.inc()
+                    log.warning("Error decoding sensor payload: %s", e)
+                    continue
+                for data in readings:
+                    station = stations.station_from_message(topic, data)
+                    # Edge nodes timestamp their readings; fall back to the arrival time
+                    timestamp = datetime.datetime.fromtimestamp(received_at).isoformat()
+                    data_with_timestamp = {"timestamp": timestamp, **data}
+                    try:
+                        score = history_store.parse_time(data_with_timestamp["timestamp"])
+                    except (ValueError, TypeError):
+                        score = received_at
+                    # Latest sensor values: later readings in the batch overwrite earlier ones
+                    # (Redis hashes only hold scalars: skip None values and nested fields)
+                    latest.setdefault(station, {}).update(
+                        {k: v for k, v in data_with_timestamp.items()
+                         if isinstance(v, (str, int, float)) and not isinstance(v, bool)})
+                    if station == DEFAULT_STATION:
+                        # Store history of sensor readings, indexed by epoch timestamp
+                        history_store.add_reading(pipe, data_with_timestamp, score)
+                        # Update the 1 min / 10 min / 1 h aggregate buckets
+                        rollups.add_reading(pipe, data_with_timestamp, score)
+                    sensor_updates.append((station, data_with_timestamp))
+            elif stations.is_forecast_topic(topic):
+                try:
+                    # Only the newest forecast of each station in a batch matters
+                    forecast = json.loads(payload.decode())
+                    forecasts[stations.station_from_message(topic, forecast)] = forecast
+                except (json.JSONDecodeError, UnicodeDecodeError, AttributeError) as e:
+                    INGEST_ERRORS.inc()
+                    log.warning("Error decoding JSON: %s", e)
+            elif topic == stations.EVALUATION_TOPIC:
+                # Forecast accuracy summary from the forecast node, stored as received
+                evaluation = payload.decode("utf-8", errors="replace")
+        except Exception as e:
+            INGEST_ERRORS.inc()
+            log.error("Error processing MQTT message on %s: %s", topic, e)
+
+    for station, values in latest.items():
+        pipe.hset(latest_key(station), mapping=values)
+    if DEFAULT_STATION in latest:
+        history_store.trim(pipe)
+        rollups.trim(pipe)
+    for station, forecast in forecasts.items():
+        pipe.set(forecast_key(station), json.dumps(forecast))
+        if station == DEFAULT_STATION:
+            # Forecast history, indexed by the epoch base timestamp
+            try:
+                score = history_store.parse_time(forecast.get("base_timestamp"))
+            except (ValueError, TypeError, AttributeError):
+                score = None
+            history_store.add_forecast(pipe, forecast, time.time() if score is None else score)
+            history_store.trim(pipe)
+    if evaluation is not None:
+        pipe.set(EVALUATION_KEY, evaluation)
+    if latest or forecasts:
+        # Invalidates the cached /data responses
+        response_cache.bump(pipe)
+    with REDIS_WRITE_SECONDS.time():
+        pipe.execute()
+    INGEST_BATCH_SIZE.observe(len(batch))
+    INGEST_MESSAGES.labels("sensor").inc(len(sensor_updates))
+    INGEST_MESSAGES.labels("forecast").inc(len(forecasts))
+
+    # Queue Socket.IO updates for the station rooms; the broadcaster coalesces
+    # them and sends only the changed fields at most BROADCAST_MAX_RATE per second
+    for station, update in sensor_updates:
+        broadcaster.publish('sensor_update', station, update)
+    for station, forecast in forecasts.items():
+        broadcaster.publish('forecast_update', station, forecast, delta=False)
+    if latest or forecasts:
+        update_safety(set(latest) | set(forecasts))
+    if sensor_updates or forecasts:
+        log.info("Stored %d sensor readings and %d forecasts in Redis.", len(sensor_updates), len(forecasts))
+
+def update_safety(station_ids):
+    """
+    Recomputes the safety level of each station from its stored latest
+    reading and forecast, once per ingest batch. Results that changed are
+    stored in the safety hash and sent to the station's room as safety_update.
+    """
+    station_ids = sorted(station_ids)
+    pipe = r.pipeline(transaction=False)
+    for station in station_ids:
+        pipe.hgetall(latest_key(station))
+        pipe.get(forecast_key(station))
+    pipe.hmget(safety.SAFETY_KEY, station_ids)
+    values = pipe.execute()
+    previous = values.pop()
+    changed = {}
+    for i, station in enumerate(station_ids):
+        latest_data, forecast = values[2 * i], values[2 * i + 1]
+        if not latest_data or not forecast:
+            continue
+        try:
+            result = safety.assess(decode_latest(latest_data), json.loads(forecast))
+        except (KeyError, TypeError, ValueError) as e:
+            log.warning("Cannot assess safety of %s: %s", station, e)
+            continue
+        if result is None:
+            continue
+        encoded = json.dumps({"station": station, **result})
+        if encoded != previous[i]:
+            changed[station] = encoded
+            if previous[i] is None or json.loads(previous[i])["level"] != result["level"]:
+                # Every change is logged: the rate limit must not hide other stations' changes
+                log.info("Safety level of %s is now %s", station, result["level"], extra={"rate_limit": False})
+    if not changed:
+        return
+    pipe = r.pipeline(transaction=True)
+    pipe.hset(safety.SAFETY_KEY, mapping=changed)
+    # Cached responses may already hold the previous levels
+    response_cache.bump(pipe)
+    pipe.execute()
+    for station, encoded in changed.items():
+        broadcaster.publish('safety_update', station, json.loads(encoded), delta=False)
+
+ingest = IngestBuffer(
+    write_batch,
+    max_batch=int(os.getenv("INGEST_MAX_BATCH", 200)),
+    max_delay=float(os.getenv("INGEST_MAX_DELAY", 0.25)),
+)
+Gauge("dashboard_ingest_queue_depth", "MQTT messages waiting to be stored").set_function(
+    lambda: ingest.queue.qsize())
+Gauge("dashboard_ingest_dropped", "MQTT messages dropped because the ingest queue was full").set_function(
+    lambda: ingest.dropped)
+Gauge("dashboard_broadcast_pending", "Socket.IO room updates waiting for the next send tick").set_function(
+    lambda: len(broadcaster.pending))
 
 @mqtt.on_message()
 def handle_mqtt_message(client, userdata, message):
-    topic = message.topic
-    try:
-        data = json.loads(message.payload.decode())
-        timestamp = datetime.datetime.now().isoformat()
-        if topic == app.config['MQTT_TOPIC']:
-            # Process sensor data
-            data_with_timestamp = {"timestamp": timestamp, **data}
-            print(f"Received Sensor Data: {data_with_timestamp}")
-            
-            # Store latest sensor values (overwrite each time)
-            r.hset("sensor_data", mapping=data_with_timestamp)
-            # Store history of sensor readings with timestamp
-            r.rpush("sensor_data_history", json.dumps(data_with_timestamp))
-            
-            # Emit sensor update via Socket.IO
-            socketio.emit('sensor_update', data_with_timestamp)
-            print("Stored sensor data in Redis.")
-        
-        elif topic == "forecast/data":
-            # Process forecast data
-            print(f"Received Forecast Data: {data}")
-            r.set("forecast_data", json.dumps(data))
-            # Emit forecast update via Socket.IO
-            socketio.emit('forecast_update', data)
-            print("Stored forecast data in Redis.")
-            
-    except json.JSONDecodeError as e:
-        print("Error decoding JSON:", e)
+    # Runs on the MQTT network thread: only queue the raw message here,
+    # decoding, storage and Socket.IO emits happen on the ingest thread
+    ingest.submit(message.topic, message.payload, time.time())
+
+# Dashboards join the room of the station they display
+@socketio.on('join')
+def handle_join(message):
+    station = str((message or {}).get("station") or DEFAULT_STATION)
+    join_room(station)
+    # Room updates only carry changed fields: start the client from the stored state
+    latest_data = r.hgetall(latest_key(station))
+    if latest_data:
+        emit('sensor_update', decode_latest(latest_data))
+    forecast = r.get(forecast_key(station))
+    if forecast:
+        emit('forecast_update', json.loads(forecast))
+    level = r.hget(safety.SAFETY_KEY, station)
+    if level:
+        emit('safety_update', json.loads(level))
+
+# Request latency per endpoint (the metrics scrape itself is not timed)
+@app.before_request
+def start_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request(response):
+    started = g.pop("request_started", None)
+    if started is not None and request.endpoint != "get_metrics":
+        REQUEST_SECONDS.labels(request.endpoint or "unknown", str(response.status_code)).observe(
+            time.perf_counter() - started)
+    return response
+
+# Prometheus metrics of this server process
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    body, content_type = metrics.exposition()
+    return Response(body, content_type=content_type)
+
+# Ingest queue depth and Redis flush latency
+@app.route('/data/ingest_stats', methods=['GET'])
+def get_ingest_stats():
+    return jsonify(ingest.stats()), 200
+
+# Socket.IO fan-out counters
+@app.route('/data/broadcast_stats', methods=['GET'])
+def get_broadcast_stats():
+    return jsonify(broadcaster.stats()), 200
+
+# Response cache counters
+@app.route('/data/cache_stats', methods=['GET'])
+def get_cache_stats():
+    return jsonify(cache.stats()), 200
 
 # Fetch latest sensor data
 @app.route('/data/latest', methods=['GET'])
+@cache.cached
 def get_latest_data():
     latest_data = r.hgetall("sensor_data")
     return jsonify(latest_data), 200
 
 # Fetch sensor data history
+# Query parameters (all optional):
+#   from, to  - time window as epoch seconds or ISO-8601
+#   limit     - page size (default 500, max 5000)
+#   cursor    - value of "next_cursor" from the previous page
+#   resolution - "raw" (default) or a rollup tier: "1m", "10m", "1h"
 @app.route('/data/history', methods=['GET'])
+@cache.cached
 def get_data_history():
-    history = r.lrange("sensor_data_history", 0, -1)
-    return jsonify([json.loads(item) for item in history]), 200
+    try:
+        start = history_store.parse_time(request.args.get('from'))
+        end = history_store.parse_time(request.args.get('to'))
+        limit = int(request.args.get('limit', history_store.DEFAULT_PAGE_LIMIT))
+        cursor = request.args.get('cursor')
+        resolution = request.args.get('resolution', 'raw')
+        if resolution == 'raw':
+            items, next_cursor = history_store.get_history(r, start, end, limit, cursor)
+        else:
+            items, next_cursor = rollups.get_rollups(r, resolution, start, end, limit, cursor)
+    except ValueError as e:
+        return jsonify({"error": f"Invalid query parameter: {e}"}), 400
+    return jsonify({"data": items, "next_cursor": next_cursor}), 200
+
+# Online forecast accuracy: running MAE/RMSE per model, feature and forecast step,
+# computed by the forecast node against the readings that actually arrived
+@app.route('/metrics/forecast', methods=['GET'])
+def get_forecast_metrics():
+    evaluation = r.get(EVALUATION_KEY)
+    if not evaluation:
+        return jsonify({"error": "No forecast evaluation received yet"}), 404
+    return app.response_class(evaluation, mimetype='application/json')
+
+# Everything a freshly loaded dashboard needs in one round trip:
+# the latest reading, the latest forecast, its safety level and downsampled
+# recent history.
+# Query parameters (optional): station (default "default")
+@app.route('/api/snapshot', methods=['GET'])
+@cache.cached
+def get_snapshot():
+    station = request.args.get('station') or DEFAULT_STATION
+    pipe = r.pipeline(transaction=False)
+    pipe.hgetall(latest_key(station))
+    pipe.get(forecast_key(station))
+    pipe.hget(safety.SAFETY_KEY, station)
+    latest_data, forecast, level = pipe.execute()
+    history = []
+    if station == DEFAULT_STATION:
+        start = time.time() - SNAPSHOT_HISTORY_SECONDS
+        history, _ = rollups.get_rollups(
+            r, SNAPSHOT_HISTORY_RESOLUTION, start, None, history_store.MAX_PAGE_LIMIT)
+    return jsonify({
+        "station": station,
+        "latest": decode_latest(latest_data) if latest_data else None,
+        "forecast": json.loads(forecast) if forecast else None,
+        "safety": json.loads(level) if level else None,
+        "history": history,
+        "history_resolution": SNAPSHOT_HISTORY_RESOLUTION,
+    }), 200
+
+# Safety level (SAFE / CAUTION / AVOID) of every station, computed on ingest
+# from its latest reading and forecast (see safety.py)
+# Query parameters (optional): station - only that station
+@app.route('/api/safety', methods=['GET'])
+@cache.cached
+def get_safety():
+    station = request.args.get('station')
+    if station:
+        level = r.hget(safety.SAFETY_KEY, station)
+        if not level:
+            return jsonify({"error": f"No safety level for station {station}"}), 404
+        return app.response_class(level, mimetype='application/json')
+    levels = r.hgetall(safety.SAFETY_KEY)
+    return jsonify({"stations": {station: json.loads(level) for station, level in levels.items()}}), 200
+
+# Training data export: 10-minute sensor means in the Jena dataset's CSV layout,
+# read from the on-disk archive and the recent history in Redis, streamed day by day.
+# Covers the default station only, the one station with history (see above).
+# Query parameters (optional): from, to - epoch seconds or ISO-8601
+@app.route('/data/export', methods=['GET'])
+def export_history():
+    try:
+        start = history_store.parse_time(request.args.get('from'))
+        end = history_store.parse_time(request.args.get('to'))
+    except ValueError as e:
+        return jsonify({"error": f"Invalid query parameter: {e}"}), 400
+    return Response(stream_with_context(archive.export_rows(r, start, end)), mimetype='text/csv',
+                    headers={"Content-Disposition": "attachment; filename=sensor_history.csv"})
+
+def archive_task():
+    # Moves history older than ARCHIVE_AFTER_DAYS out of Redis into the archive
+    while True:
+        try:
+            archived = archive.compact(r)
+            if any(archived.values()):
+                log.info("Archived %d readings and %d forecasts.", archived["sensor"], archived["forecast"])
+        except Exception as e:
+            log.error("Error archiving history: %s", e)
+        socketio.sleep(archive.ARCHIVE_INTERVAL_SECONDS)
 
 # Dashboard route renders the template which should include map & chart containers
 @app.route('/dashboard')
@@ -92,5 +461,18 @@ def dashboard():
     return render_template('dashboard.html')
 
 if __name__ == '__main__':
-    mqtt.init_app(app)
-    socketio.run(app, host='0.0.0.0', port=5000, debug=True)
+    if INGEST_ENABLED:
+        migrated = history_store.migrate_legacy_history(r)
+        if migrated:
+            log.info("Migrated %d readings from the legacy history list.", migrated)
+        ingest.start()
+        broadcaster.start()
+        if archive.ARCHIVE_INTERVAL_SECONDS > 0:
+            socketio.start_background_task(archive_task)
+        mqtt.init_app(app)
+    # Werkzeug is only used without an async worker; Flask-SocketIO refuses it
+    # outside debug mode unless explicitly allowed
+    run_options = {}
+    if socketio.server.eio.async_mode == 'threading':
+        run_options['allow_unsafe_werkzeug'] = True
+    socketio.run(app, host='0.0.0.0', port=WEB_PORT, **run_options)
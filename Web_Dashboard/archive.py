@@ -0,0 +1,329 @@
+"""
+Long-term archive of sensor and forecast history.
+
+Redis keeps the recent history; compact() moves everything older than
+ARCHIVE_AFTER_SECONDS into compressed NumPy chunks on disk, partitioned by
+kind and day:
+
+    <ARCHIVE_DIR>/<kind>/<station>/<YYYY-MM-DD>/<first ms>-<last ms>[.<n>].npz
+
+Each run appends new chunk files and never rewrites old ones; entries that
+reach Redis late (e.g. a sensor backlog drained after an outage) go into a
+new chunk of their day.
+
+Only the default station has history in Redis (app.py keeps history and
+rollups for it alone), so only its <station> directory is ever written and
+exported; other stations have neither history nor an archive. A chunk holds
+one array per column: sensor chunks have "timestamp" plus one float32 array
+per field (NaN where a reading did not carry the field). Forecast chunks have
+"base_timestamp" plus one (forecasts, FORECAST_STEPS) array per field, where
+column i is step i + 1.
+
+export_rows() streams the sensor history (archive first, then what is still
+in Redis) as 10-minute means in the column layout of the Jena climate
+dataset the model was trained on, ready for retraining.
+
+    python3 archive.py compact
+    python3 archive.py export --from 2025-03-01 --to 2025-04-01 --output sensors.csv
+"""
+import argparse
+import datetime
+import heapq
+import itertools
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import redis
+
+import history_store
+
+#############################
+# Configuration
+#############################
+
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "archive"))
+# History older than this moves from Redis to the archive (keep it below
+# HISTORY_RETENTION_SECONDS, or it is trimmed before it is archived)
+ARCHIVE_AFTER_SECONDS = int(float(os.getenv("ARCHIVE_AFTER_DAYS", 2)) * 24 * 3600)
+# How often the dashboard server compacts (0 disables)
+ARCHIVE_INTERVAL_SECONDS = int(os.getenv("ARCHIVE_INTERVAL_SECONDS", 3600))
+
+# The only station with history in Redis, and so the only one archived
+ARCHIVE_STATION = "default"
+
+FIELDS = ["air_pressure", "temperature", "humidity", "wind_speed"]
+# Forecast steps kept per archived forecast (the model's output length)
+FORECAST_STEPS = 24
+
+# Training data layout (same mapping as key_mapping in Forecast_Model/forecaster.py)
+JENA_TIME_COLUMN = "Date Time"
+JENA_TIME_FORMAT = "%d.%m.%Y %H:%M:%S"
+JENA_COLUMNS = {
+    "air_pressure": "p (mbar)",
+    "temperature": "T (degC)",
+    "humidity": "rh (%)",
+    "wind_speed": "wv (m/s)",
+}
+EXPORT_STEP_SECONDS = 600
+
+#############################
+# Chunk Files
+#############################
+
+def _day(timestamp):
+    return datetime.datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d")
+
+def _station_dir(kind, station):
+    return os.path.join(ARCHIVE_DIR, kind, station)
+
+def _chunk_range(name):
+    first, last = name.split(".")[0].split("-")
+    return int(first) / 1000, int(last) / 1000
+
+def _chunks(kind, station):
+    """
+    Yields (day, chunk paths) in day order.
+    """
+    root = _station_dir(kind, station)
+    if not os.path.isdir(root):
+        return
+    for day in sorted(os.listdir(root)):
+        names = sorted((n for n in os.listdir(os.path.join(root, day)) if n.endswith(".npz")),
+                       key=lambda n: _chunk_range(n)[0])
+        if names:
+            yield day, [os.path.join(root, day, n) for n in names]
+
+def write_chunk(kind, station, time_column, arrays):
+    """
+    Writes one chunk of a single day. The file appears atomically, so
+    readers never see a partial chunk. A chunk identical to an existing one
+    (written by a run interrupted before it removed the entries from Redis)
+    is not written again.
+    """
+    times = arrays[time_column]
+    directory = os.path.join(_station_dir(kind, station), _day(times[0]))
+    os.makedirs(directory, exist_ok=True)
+    name = f"{int(times[0] * 1000)}-{int(times[-1] * 1000)}"
+    path = os.path.join(directory, name + ".npz")
+    for n in itertools.count(1):
+        if not os.path.exists(path):
+            break
+        with np.load(path) as existing:
+            if np.array_equal(existing[time_column], times):
+                return path
+        path = os.path.join(directory, f"{name}.{n}.npz")
+    with open(path + ".tmp", "wb") as f:
+        np.savez_compressed(f, **arrays)
+    os.replace(path + ".tmp", path)
+    return path
+
+def load_day(paths):
+    """
+    Concatenates the chunks of one day into one dict of column arrays.
+    """
+    chunks = []
+    for path in paths:
+        with np.load(path) as data:
+            chunks.append({name: data[name] for name in data.files})
+    return {name: np.concatenate([c[name] for c in chunks]) for name in chunks[0]}
+
+def load(kind, station=ARCHIVE_STATION, start=None, end=None):
+    """
+    Yields (day, columns) of the archived days overlapping [start, end].
+    """
+    time_column = "timestamp" if kind == "sensor" else "base_timestamp"
+    for day, paths in _chunks(kind, station):
+        ranges = [_chunk_range(os.path.basename(p)) for p in paths]
+        paths = [p for p, (first, last) in zip(paths, ranges)
+                 if (end is None or first <= end) and (start is None or last >= start)]
+        if not paths:
+            continue
+        columns = load_day(paths)
+        times = columns[time_column]
+        keep = np.ones(len(times), dtype=bool)
+        if start is not None:
+            keep &= times >= start
+        if end is not None:
+            keep &= times <= end
+        yield day, {name: values[keep] for name, values in columns.items()}
+
+#############################
+# Compaction
+#############################
+
+def _value(value):
+    return np.nan if value is None or isinstance(value, (str, bool, dict)) else value
+
+def sensor_columns(entries):
+    """
+    Column arrays of (reading, score) pairs.
+    """
+    return {
+        "timestamp": np.array([score for _, score in entries], dtype=np.float64),
+        **{f: np.array([_value(r.get(f)) for r, _ in entries], dtype=np.float32) for f in FIELDS},
+    }
+
+def forecast_columns(entries):
+    """
+    Column arrays of (forecast, score) pairs; row-form forecasts
+    ("predictions" lists) are stored by their position.
+    """
+    columns = {"base_timestamp": np.array([score for _, score in entries], dtype=np.float64)}
+    for field in FIELDS:
+        columns[field] = np.full((len(entries), FORECAST_STEPS), np.nan, dtype=np.float32)
+    for row, (forecast, _) in enumerate(entries):
+        if "predictions" in forecast:
+            steps = range(1, len(forecast["predictions"]) + 1)
+            values = {f: [p.get(f) for p in forecast["predictions"]] for f in FIELDS}
+        else:
+            steps, values = forecast.get("steps", []), forecast
+        for field in FIELDS:
+            series = values.get(field) or []
+            for step, value in zip(steps, series):
+                if 1 <= step <= FORECAST_STEPS:
+                    columns[field][row, step - 1] = _value(value)
+    return columns
+
+ARCHIVES = [
+    # kind, Redis key, time column, columns builder
+    ("sensor", history_store.HISTORY_KEY, "timestamp", sensor_columns),
+    ("forecast", history_store.FORECAST_HISTORY_KEY, "base_timestamp", forecast_columns),
+]
+
+def _move(conn, key, kind, station, time_column, build, rows):
+    # Writes one day's (member, score) rows to a chunk, then removes exactly
+    # those members: entries added to Redis meanwhile stay for the next run
+    write_chunk(kind, station, time_column, build([(json.loads(member), score) for member, score in rows]))
+    with conn.pipeline(transaction=False) as pipe:
+        for i in range(0, len(rows), history_store.MAX_PAGE_LIMIT):
+            pipe.zrem(key, *[member for member, _ in rows[i:i + history_store.MAX_PAGE_LIMIT]])
+        pipe.execute()
+    return len(rows)
+
+def compact(conn, now=None, station=ARCHIVE_STATION):
+    """
+    Moves Redis history older than ARCHIVE_AFTER_SECONDS into the archive,
+    one chunk per day, removing from Redis exactly the entries written.
+    Entries that arrived late for an already archived day get a chunk of
+    their own. Returns the number of entries archived per kind.
+    """
+    now = time.time() if now is None else now
+    cutoff = now - ARCHIVE_AFTER_SECONDS
+    archived = {}
+    for kind, key, time_column, build in ARCHIVES:
+        day, rows, count, cursor = None, [], 0, None
+        while True:
+            # Removed members all score below the cursor, so paging stays valid
+            page, cursor = history_store.range_page(conn, key, None, cutoff, history_store.MAX_PAGE_LIMIT, cursor)
+            for member, score in page:
+                if day is not None and _day(score) != day:
+                    count += _move(conn, key, kind, station, time_column, build, rows)
+                    rows = []
+                day = _day(score)
+                rows.append((member, score))
+            if cursor is None:
+                break
+        if rows:
+            count += _move(conn, key, kind, station, time_column, build, rows)
+        archived[kind] = count
+    return archived
+
+#############################
+# Export
+#############################
+
+def resample(timestamps, columns, step=EXPORT_STEP_SECONDS):
+    """
+    Per-field means over `step`-second buckets. Returns the bucket starts
+    and one array per field (NaN where a bucket had no value).
+    """
+    buckets = np.floor(timestamps / step).astype(np.int64)
+    starts, index = np.unique(buckets, return_inverse=True)
+    means = {}
+    for field in FIELDS:
+        values = columns[field].astype(np.float64)
+        valid = ~np.isnan(values)
+        sums = np.zeros(len(starts))
+        counts = np.zeros(len(starts))
+        np.add.at(sums, index[valid], values[valid])
+        np.add.at(counts, index[valid], 1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means[field] = sums / counts
+    return starts * step, means
+
+def _csv_rows(starts, means):
+    fields = np.column_stack([means[f] for f in FIELDS])
+    for start, values in zip(starts, fields):
+        time_text = datetime.datetime.fromtimestamp(start).strftime(JENA_TIME_FORMAT)
+        yield ",".join([time_text] + ["" if np.isnan(v) else f"{v:.2f}" for v in values]) + "\n"
+
+def _redis_days(conn, start, end):
+    # History still in Redis, as (day, columns), one day at a time
+    cursor, day, entries = None, None, []
+    while True:
+        rows, cursor = history_store.range_page(conn, history_store.HISTORY_KEY, start, end,
+                                                history_store.MAX_PAGE_LIMIT, cursor)
+        for member, score in rows:
+            if day is not None and _day(score) != day:
+                yield day, sensor_columns(entries)
+                entries = []
+            day = _day(score)
+            entries.append((json.loads(member), score))
+        if cursor is None:
+            break
+    if entries:
+        yield day, sensor_columns(entries)
+
+def export_rows(conn, start=None, end=None, station=ARCHIVE_STATION):
+    """
+    Yields CSV lines (header first) of the 10-minute sensor means between
+    `start` and `end`, one day at a time, in the Jena column layout.
+    """
+    yield ",".join([JENA_TIME_COLUMN] + [JENA_COLUMNS[f] for f in FIELDS]) + "\n"
+    days = load("sensor", station, start, end)
+    if conn is not None and station == ARCHIVE_STATION:
+        # Redis holds what has not been archived yet, late entries of
+        # archived days included
+        days = _merge_days(days, _redis_days(conn, start, end))
+    for _, columns in days:
+        if len(columns["timestamp"]):
+            yield from _csv_rows(*resample(columns["timestamp"], columns))
+
+def _merge_days(*sources):
+    # Sources yield days in order; a day found in several of them is merged
+    # so a bucket split across the archive and Redis is averaged once
+    merged = heapq.merge(*sources, key=lambda item: item[0])
+    for day, group in itertools.groupby(merged, key=lambda item: item[0]):
+        parts = [columns for _, columns in group]
+        yield day, {name: np.concatenate([c[name] for c in parts]) for name in parts[0]}
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive Redis history to disk and export training data.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("compact", help="move history older than ARCHIVE_AFTER_DAYS to the archive")
+    export = commands.add_parser("export", help="write 10-minute sensor means in the Jena CSV layout")
+    export.add_argument("--from", dest="start", help="epoch seconds or ISO-8601")
+    export.add_argument("--to", dest="end", help="epoch seconds or ISO-8601")
+    export.add_argument("--archive-only", action="store_true", help="do not read Redis")
+    export.add_argument("--output", help="write CSV here instead of stdout")
+    args = parser.parse_args()
+
+    conn = None
+    if args.command == "compact" or not args.archive_only:
+        conn = redis.Redis(host=os.getenv("REDIS_HOST", "localhost"), port=int(os.getenv("REDIS_PORT", 6379)),
+                           db=0, decode_responses=True)
+    if args.command == "compact":
+        print(json.dumps(compact(conn)))
+        return
+    rows = export_rows(conn, history_store.parse_time(args.start), history_store.parse_time(args.end))
+    if args.output:
+        with open(args.output, "w") as f:
+            f.writelines(rows)
+    else:
+        sys.stdout.writelines(rows)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import logging
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+class Broadcaster:
+    """
+    Throttled Socket.IO fan-out. Updates are published per (event, room) and
+    coalesced until the next send tick, so every room receives each event at
+    most `max_rate` times per second however fast readings arrive.
+
+    For delta events the pending updates are merged field by field and only
+    the fields that differ from what the room was last sent go out; clients
+    merge them into their current state (full state for newly joined clients
+    is sent separately, see app.py). Other events are sent whole, latest wins.
+
+    on_flush(seconds, emitted), if given, is called after every send tick
+    that had updates pending.
+    """
+
+    def __init__(self, socketio, max_rate=1.0, on_flush=None):
+        self.socketio = socketio
+        self.on_flush = on_flush
+        if not max_rate > 0:
+            raise ValueError(f"max_rate must be a positive number of sends per second, got {max_rate!r}")
+        self.max_rate = max_rate
+        self.interval = 1.0 / max_rate
+        self.lock = threading.Lock()
+        self.pending = {}   # (event, room) -> (data, delta)
+        self.sent = {}      # (event, room) -> state the room was last sent
+        self.published = 0
+        self.coalesced = 0
+        self.emitted = 0
+        self.suppressed = 0
+        self.last_flush_ms = 0.0
+
+    def start(self):
+        # A background task of the Socket.IO async mode (green thread under
+        # eventlet/gevent, a real thread otherwise)
+        self.socketio.start_background_task(self._run)
+
+    def publish(self, event, room, data, delta=True):
+        key = (event, room)
+        with self.lock:
+            self.published += 1
+            if key in self.pending:
+                self.coalesced += 1
+                if delta:
+                    data = {**self.pending[key][0], **data}
+            self.pending[key] = (data, delta)
+
+    def _run(self):
+        while True:
+            self.socketio.sleep(self.interval)
+            try:
+                self.flush()
+            except Exception as e:
+                log.error("Error broadcasting updates: %s", e)
+
+    def flush(self):
+        with self.lock:
+            pending, self.pending = self.pending, {}
+        if not pending:
+            return
+        started = time.perf_counter()
+        emitted = 0
+        for (event, room), (data, delta) in pending.items():
+            if delta:
+                previous = self.sent.get((event, room), {})
+                changes = {field: value for field, value in data.items() if previous.get(field) != value}
+                self.sent[(event, room)] = {**previous, **data}
+                if not changes:
+                    self.suppressed += 1
+                    continue
+                data = changes
+            self.socketio.emit(event, data, to=room)
+            emitted += 1
+        elapsed = time.perf_counter() - started
+        self.emitted += emitted
+        self.last_flush_ms = elapsed * 1000
+        if self.on_flush is not None:
+            self.on_flush(elapsed, emitted)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "pending": len(self.pending),
+                "published": self.published,
+                "coalesced": self.coalesced,
+                "emitted": self.emitted,
+                "suppressed": self.suppressed,
+                "last_flush_ms": round(self.last_flush_ms, 3),
+                "max_rate": self.max_rate,
+            }
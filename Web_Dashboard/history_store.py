@@ -0,0 +1,134 @@
+import json
+import os
+import time
+import datetime
+
+#############################
+# Configuration
+#############################
+
+# Sorted set holding every sensor reading, scored by its epoch timestamp
+HISTORY_KEY = "sensor_history"
+# Sorted set holding every published forecast, scored by its base timestamp
+FORECAST_HISTORY_KEY = "forecast_history"
+# Pre-ZSET history list, only read once to migrate old deployments
+LEGACY_HISTORY_KEY = "sensor_data_history"
+
+# Readings and forecasts older than this are trimmed from Redis (default: 7 days);
+# archive.py normally moves them to disk well before that
+RETENTION_SECONDS = int(os.getenv("HISTORY_RETENTION_SECONDS", 7 * 24 * 3600))
+# Trim at most once per interval instead of on every write
+TRIM_INTERVAL_SECONDS = 60
+
+DEFAULT_PAGE_LIMIT = 500
+MAX_PAGE_LIMIT = 5000
+
+_last_trim = 0.0
+
+#############################
+# Helper Functions
+#############################
+def parse_time(value):
+    """
+    Parses a query-string time bound into epoch seconds.
+    Accepts epoch seconds (int or float) or an ISO-8601 timestamp.
+    Returns None for an empty value.
+    """
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.datetime.fromisoformat(value).timestamp()
+
+def encode_cursor(score, skip):
+    return f"{score!r}:{skip}"
+
+def decode_cursor(cursor):
+    """
+    A cursor is "<score>:<skip>": resume at <score> (inclusive), skipping the
+    first <skip> members with that exact score, which were already returned.
+    """
+    score, skip = cursor.rsplit(":", 1)
+    return float(score), int(skip)
+
+def add_reading(conn, reading, score):
+    """
+    Appends a reading to the history sorted set.
+    `conn` may be a Redis client or a pipeline, so callers can batch writes.
+    """
+    conn.zadd(HISTORY_KEY, {json.dumps(reading): score})
+
+def add_forecast(conn, forecast, score):
+    """
+    Appends a forecast to the forecast history sorted set.
+    """
+    conn.zadd(FORECAST_HISTORY_KEY, {json.dumps(forecast): score})
+
+def trim(conn, now=None, force=False):
+    """
+    Drops readings and forecasts older than RETENTION_SECONDS.
+    Rate limited to one pass per TRIM_INTERVAL_SECONDS unless forced.
+    """
+    global _last_trim
+    now = time.time() if now is None else now
+    if not force and now - _last_trim < TRIM_INTERVAL_SECONDS:
+        return
+    _last_trim = now
+    conn.zremrangebyscore(HISTORY_KEY, "-inf", now - RETENTION_SECONDS)
+    conn.zremrangebyscore(FORECAST_HISTORY_KEY, "-inf", now - RETENTION_SECONDS)
+
+def range_page(conn, key, start=None, end=None, limit=DEFAULT_PAGE_LIMIT, cursor=None):
+    """
+    Reads one page of members from the sorted set `key` with start <= score <= end.
+    Returns (members_with_scores, next_cursor); next_cursor is None on the last page.
+    Cost is O(log(N) + limit) regardless of the total history size.
+    """
+    limit = max(1, min(int(limit), MAX_PAGE_LIMIT))
+    skip = 0
+    if cursor:
+        start, skip = decode_cursor(cursor)
+    low = "-inf" if start is None else start
+    high = "+inf" if end is None else end
+
+    # Fetch one extra member to find out whether another page exists
+    rows = conn.zrangebyscore(key, low, high, start=skip, num=limit + 1, withscores=True)
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last_score = rows[-1][1]
+    # Count the members sharing the last score so the next page can skip them
+    same_score = sum(1 for _, score in rows if score == last_score)
+    if cursor and same_score == len(rows) and last_score == start:
+        same_score += skip
+    return rows, encode_cursor(last_score, same_score)
+
+def get_history(conn, start=None, end=None, limit=DEFAULT_PAGE_LIMIT, cursor=None):
+    """
+    Returns one page of raw sensor readings and the cursor for the next page.
+    """
+    rows, next_cursor = range_page(conn, HISTORY_KEY, start, end, limit, cursor)
+    return [json.loads(member) for member, _ in rows], next_cursor
+
+def migrate_legacy_history(conn):
+    """
+    Moves readings from the old unbounded RPUSH list into the sorted set.
+    Safe to call on every start; does nothing once the list is gone.
+    """
+    if not conn.exists(LEGACY_HISTORY_KEY):
+        return 0
+    migrated = 0
+    pipe = conn.pipeline()
+    for item in conn.lrange(LEGACY_HISTORY_KEY, 0, -1):
+        try:
+            reading = json.loads(item)
+            score = datetime.datetime.fromisoformat(reading["timestamp"]).timestamp()
+        except (ValueError, KeyError, TypeError):
+            continue
+        pipe.zadd(HISTORY_KEY, {item: score})
+        migrated += 1
+    pipe.delete(LEGACY_HISTORY_KEY)
+    pipe.execute()
+    trim(conn, force=True)
+    return migrated
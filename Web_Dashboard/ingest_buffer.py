@@ -0,0 +1,101 @@
+import logging
+import queue
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+class IngestBuffer:
+    """
+    Collects raw MQTT messages off the network thread and hands them to a
+    flush callback in batches. A batch is flushed as soon as it holds
+    `max_batch` messages or `max_delay` seconds after its first message,
+    whichever comes first.
+
+    The flush callback receives a list of (topic, payload, received_at) tuples
+    and is expected to write them with a single Redis pipeline.
+    """
+
+    def __init__(self, flush, max_batch=200, max_delay=0.25, max_queue=10000):
+        self.flush = flush
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.lock = threading.Lock()
+        self.thread = None
+        self.batches = 0
+        self.messages = 0
+        self.dropped = 0
+        self.errors = 0
+        self.last_flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+        self.total_flush_seconds = 0.0
+        self.last_batch_size = 0
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name="ingest-flush", daemon=True)
+            self.thread.start()
+
+    def submit(self, topic, payload, received_at=None):
+        """
+        Queues one message. Never blocks the caller; returns False and counts
+        the message as dropped when the queue is full.
+        """
+        received_at = time.time() if received_at is None else received_at
+        try:
+            self.queue.put_nowait((topic, payload, received_at))
+            return True
+        except queue.Full:
+            with self.lock:
+                self.dropped += 1
+            return False
+
+    def stats(self):
+        with self.lock:
+            return {
+                "queue_depth": self.queue.qsize(),
+                "batches": self.batches,
+                "messages": self.messages,
+                "dropped": self.dropped,
+                "errors": self.errors,
+                "last_batch_size": self.last_batch_size,
+                "last_flush_ms": round(self.last_flush_seconds * 1000, 3),
+                "max_flush_ms": round(self.max_flush_seconds * 1000, 3),
+                "avg_flush_ms": round(self.total_flush_seconds * 1000 / self.batches, 3) if self.batches else 0.0,
+            }
+
+    def _collect(self):
+        # Block until the first message arrives, then gather more until the
+        # batch is full or its deadline passes
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            try:
+                self.flush(batch)
+                failed = False
+            except Exception as e:
+                log.error("Error flushing ingest batch: %s", e)
+                failed = True
+            elapsed = time.perf_counter() - started
+            with self.lock:
+                self.batches += 1
+                self.messages += len(batch)
+                self.errors += int(failed)
+                self.last_batch_size = len(batch)
+                self.last_flush_seconds = elapsed
+                self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+                self.total_flush_seconds += elapsed
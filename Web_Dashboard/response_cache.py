@@ -0,0 +1,106 @@
+import collections
+import functools
+import gzip
+import threading
+import zlib
+
+from flask import make_response, request
+
+# Incremented by the ingest path in the same transaction as every write, so a
+# cached body is valid exactly as long as the version it was rendered at
+DATA_VERSION_KEY = "data_version"
+
+# Bodies smaller than this are not worth compressing
+GZIP_MIN_BYTES = 512
+
+def bump(conn):
+    # conn may be a client or a pipeline
+    conn.incr(DATA_VERSION_KEY)
+
+class ResponseCache:
+    """
+    In-process cache of rendered GET responses, keyed by the request path and
+    query string and tagged with the data version they were rendered at.
+
+    A request costs one Redis GET of the data version: if the client already
+    holds the current ETag it gets a 304, otherwise the stored body (gzipped
+    when the client accepts it) is sent without touching the data again.
+    Only 200 responses are cached; the least recently used entries are
+    evicted past `max_entries`.
+    """
+
+    def __init__(self, conn, max_entries=256, max_age=0):
+        self.conn = conn
+        self.max_entries = max_entries
+        self.cache_control = f"public, max-age={max_age}"
+        self.lock = threading.Lock()
+        self.entries = collections.OrderedDict()  # key -> (version, etag, mimetype, body, gzipped)
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def version(self):
+        return int(self.conn.get(DATA_VERSION_KEY) or 0)
+
+    def cached(self, view):
+        """
+        Route decorator; apply below @app.route.
+        """
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            version = self.version()
+            key = request.full_path
+            with self.lock:
+                entry = self.entries.get(key)
+                if entry is not None and entry[0] == version:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                else:
+                    entry = None
+            if entry is None:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                entry = self._store(key, version, response)
+            return self._respond(entry)
+        return wrapper
+
+    def _store(self, key, version, response):
+        body = response.get_data()
+        gzipped = gzip.compress(body, compresslevel=6) if len(body) >= GZIP_MIN_BYTES else None
+        etag = f"{version}-{zlib.crc32(key.encode()):08x}"
+        entry = (version, etag, response.mimetype, body, gzipped)
+        with self.lock:
+            self.misses += 1
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return entry
+
+    def _respond(self, entry):
+        version, etag, mimetype, body, gzipped = entry
+        if request.if_none_match.contains_weak(etag):
+            with self.lock:
+                self.not_modified += 1
+            response = make_response("", 304)
+        else:
+            response = make_response(body)
+            response.mimetype = mimetype
+            if gzipped is not None and request.accept_encodings["gzip"]:
+                response.set_data(gzipped)
+                response.headers["Content-Encoding"] = "gzip"
+        # Weak: the identity and gzip bodies share one tag
+        response.set_etag(etag, weak=True)
+        response.headers["Cache-Control"] = self.cache_control
+        response.vary.add("Accept-Encoding")
+        return response
+
+    def stats(self):
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "not_modified": self.not_modified,
+            }
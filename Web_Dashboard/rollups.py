@@ -0,0 +1,150 @@
+import os
+import time
+import datetime
+
+import history_store
+
+#############################
+# Configuration
+#############################
+
+# Sensor fields that are aggregated into rollup buckets
+FEATURES = ["air_pressure", "temperature", "humidity", "wind_speed"]
+
+# Rollup tiers: bucket width and how long buckets are kept in Redis
+ROLLUP_TIERS = {
+    "1m": {
+        "seconds": 60,
+        "retention": int(os.getenv("ROLLUP_1M_RETENTION_SECONDS", 2 * 24 * 3600)),
+    },
+    "10m": {
+        "seconds": 600,
+        "retention": int(os.getenv("ROLLUP_10M_RETENTION_SECONDS", 30 * 24 * 3600)),
+    },
+    "1h": {
+        "seconds": 3600,
+        "retention": int(os.getenv("ROLLUP_1H_RETENTION_SECONDS", 365 * 24 * 3600)),
+    },
+}
+
+TRIM_INTERVAL_SECONDS = 300
+
+# Updates count/sum/min/max of every tier's bucket in a single round trip.
+# KEYS: (bucket hash, bucket index) per tier
+# ARGV: (bucket start, ttl) per tier, then the feature count and feature/value pairs
+ROLLUP_SCRIPT = """
+local tiers = #KEYS / 2
+local n = tonumber(ARGV[tiers * 2 + 1])
+for t = 0, tiers - 1 do
+  local key = KEYS[t * 2 + 1]
+  for i = 0, n - 1 do
+    local f = ARGV[tiers * 2 + 2 + i * 2]
+    local raw = ARGV[tiers * 2 + 3 + i * 2]
+    local v = tonumber(raw)
+    redis.call('HINCRBY', key, f .. ':count', 1)
+    redis.call('HINCRBYFLOAT', key, f .. ':sum', raw)
+    local lo = tonumber(redis.call('HGET', key, f .. ':min'))
+    if not lo or v < lo then redis.call('HSET', key, f .. ':min', raw) end
+    local hi = tonumber(redis.call('HGET', key, f .. ':max'))
+    if not hi or v > hi then redis.call('HSET', key, f .. ':max', raw) end
+  end
+  redis.call('EXPIRE', key, ARGV[t * 2 + 2])
+  redis.call('ZADD', KEYS[t * 2 + 2], ARGV[t * 2 + 1], ARGV[t * 2 + 1])
+end
+return 1
+"""
+
+_script = None
+_last_trim = 0.0
+
+#############################
+# Helper Functions
+#############################
+def index_key(resolution):
+    return f"rollup:{resolution}"
+
+def bucket_key(resolution, bucket_start):
+    return f"rollup:{resolution}:{bucket_start}"
+
+def bucket_start(score, resolution):
+    width = ROLLUP_TIERS[resolution]["seconds"]
+    return int(score // width) * width
+
+def register(conn):
+    """
+    Loads the rollup Lua script. Must be called once with a real Redis client
+    before add_reading is used (the script object can then run on pipelines).
+    """
+    global _script
+    _script = conn.register_script(ROLLUP_SCRIPT)
+
+def add_reading(conn, reading, score):
+    """
+    Folds one reading into the current bucket of every rollup tier.
+    Non-numeric or missing feature values are skipped.
+    `conn` may be a Redis client or a pipeline.
+    """
+    args = []
+    for feature in FEATURES:
+        value = reading.get(feature)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            args.extend([feature, repr(float(value))])
+    if not args:
+        return
+
+    keys = []
+    tier_args = []
+    for resolution, tier in ROLLUP_TIERS.items():
+        start = bucket_start(score, resolution)
+        keys.extend([bucket_key(resolution, start), index_key(resolution)])
+        tier_args.extend([start, tier["retention"]])
+    _script(keys=keys, args=tier_args + [len(args) // 2] + args, client=conn)
+
+def trim(conn, now=None, force=False):
+    """
+    Drops expired buckets from the tier indexes (the bucket hashes expire on their own).
+    """
+    global _last_trim
+    now = time.time() if now is None else now
+    if not force and now - _last_trim < TRIM_INTERVAL_SECONDS:
+        return
+    _last_trim = now
+    for resolution, tier in ROLLUP_TIERS.items():
+        conn.zremrangebyscore(index_key(resolution), "-inf", now - tier["retention"])
+
+def get_rollups(conn, resolution, start=None, end=None,
+                limit=history_store.DEFAULT_PAGE_LIMIT, cursor=None):
+    """
+    Returns one page of pre-aggregated buckets at the given resolution and the
+    cursor for the next page. Each row holds min/max/mean/count per feature.
+    """
+    if resolution not in ROLLUP_TIERS:
+        raise ValueError(f"unknown resolution '{resolution}'")
+    rows, next_cursor = history_store.range_page(
+        conn, index_key(resolution), start, end, limit, cursor)
+
+    pipe = conn.pipeline(transaction=False)
+    for member, _ in rows:
+        pipe.hgetall(bucket_key(resolution, member))
+    buckets = pipe.execute()
+
+    series = []
+    for (_, score), fields in zip(rows, buckets):
+        if not fields:
+            continue
+        entry = {
+            "timestamp": datetime.datetime.fromtimestamp(score).isoformat(),
+            "bucket_start": int(score),
+        }
+        for feature in FEATURES:
+            count = int(fields.get(f"{feature}:count", 0))
+            if not count:
+                continue
+            entry[feature] = {
+                "mean": round(float(fields[f"{feature}:sum"]) / count, 2),
+                "min": float(fields[f"{feature}:min"]),
+                "max": float(fields[f"{feature}:max"]),
+                "count": count,
+            }
+        series.append(entry)
+    return series, next_cursor
@@ -0,0 +1,96 @@
+import numpy as np
+
+#############################
+# Safety Level Fusion
+#############################
+# Server-side port of the dashboard's AVOID / CAUTION / SAFE rule engine.
+# The latest reading is compared with the forecast steps 1 h, 2 h, 3 h and
+# 4 h ahead (every 6th 10-minute step, or the first 4 steps if the published
+# horizon has none of those). Every rule scores 0 (safe), 1 (caution) or
+# 2 (avoid); a station's level is the highest score of any rule at any step.
+# All steps are scored at once as arrays.
+
+LEVELS = ("SAFE", "CAUTION", "AVOID")
+
+FEATURES = ["air_pressure", "temperature", "humidity", "wind_speed"]
+
+# Forecast steps that are scored
+HOURLY_STEP = 6
+MAX_STEPS = 4
+
+# Results of every station, one JSON value per station in this hash
+SAFETY_KEY = "safety"
+
+def _at_least(values, caution, avoid):
+    return np.where(values >= avoid, 2, np.where(values >= caution, 1, 0))
+
+def _below(values, caution, avoid):
+    return np.where(values < avoid, 2, np.where(values < caution, 1, 0))
+
+def forecast_steps(forecast):
+    """
+    Returns (steps, {feature: values}) of the forecast steps that are scored.
+    Accepts column-form forecasts and older row-form ones ("predictions").
+    """
+    if "predictions" in forecast:
+        rows = forecast["predictions"][:MAX_STEPS]
+        columns = {f: np.array([row.get(f, np.nan) for row in rows], dtype=np.float64) for f in FEATURES}
+        return list(range(1, len(rows) + 1)), columns
+    steps = np.asarray(forecast["steps"])
+    hourly = np.nonzero(steps % HOURLY_STEP == 0)[0]
+    index = (hourly if len(hourly) else np.arange(len(steps)))[:MAX_STEPS]
+    columns = {f: np.asarray(forecast[f], dtype=np.float64)[index] for f in FEATURES}
+    return steps[index].tolist(), columns
+
+def assess(current, forecast):
+    """
+    Scores one station. `current` is its latest reading (missing fields never
+    raise the level), `forecast` its latest published forecast. Returns None
+    when the forecast has no steps.
+    """
+    steps, f = forecast_steps(forecast)
+    if not steps:
+        return None
+    now = {k: float(current.get(k)) if current.get(k) is not None else np.nan for k in FEATURES}
+    # Comparisons with NaN are False, so a missing value scores 0
+    with np.errstate(invalid="ignore"):
+        # Trends between the current reading and the last scored step
+        pressure_trend = _at_least(np.float64(now["air_pressure"] - f["air_pressure"][-1]), 3, 5)
+        humidity_trend = _at_least(np.float64(f["humidity"][-1] - now["humidity"]), 10, 20)
+
+        # Wind in km/h: change from now, and absolute strength
+        wind_kmh = f["wind_speed"] * 3.6
+        wind = np.maximum(_at_least(wind_kmh - now["wind_speed"] * 3.6, 5, 10),
+                          _at_least(wind_kmh, 40, 50))
+
+        pressure = np.maximum.reduce([
+            _at_least(now["air_pressure"] - f["air_pressure"], 3, 5),
+            _below(f["air_pressure"], 1010, 1005),
+            np.broadcast_to(pressure_trend, f["air_pressure"].shape),
+        ])
+
+        humidity = np.maximum(_at_least(f["humidity"], 80, 90), humidity_trend)
+
+        # Already very hot: avoid; otherwise large changes or hot forecasts
+        temperature = np.maximum(_at_least(np.abs(f["temperature"] - now["temperature"]), 3, 5),
+                                 _at_least(f["temperature"], 33, 35))
+        if now["temperature"] >= 35:
+            temperature = np.full(temperature.shape, 2)
+
+        # Rain formation: warm, near-saturated air under falling pressure
+        rain = np.where(
+            (f["temperature"] >= 33) & (f["humidity"] >= 80) & (f["air_pressure"] < 1010), 2,
+            np.where((f["temperature"] >= 32) & (f["humidity"] >= 75) & (f["air_pressure"] < 1012), 1, 0))
+
+    rules = {"wind": wind, "pressure": pressure, "humidity": humidity,
+             "temperature": temperature, "rain": rain}
+    step_risk = np.maximum.reduce(list(rules.values()))
+    risk = int(step_risk.max())
+    return {
+        "level": LEVELS[risk],
+        "risk": risk,
+        "base_timestamp": forecast.get("base_timestamp"),
+        "steps": steps,
+        "step_risk": step_risk.tolist(),
+        "rules": {name: int(values.max()) for name, values in rules.items()},
+    }
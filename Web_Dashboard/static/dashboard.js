@@ -1,24 +1,85 @@
 // Initialize Socket.IO connection
 const socket = io();
 
+// Station shown by this dashboard (?station=<id>); updates arrive through its room
+const station = new URLSearchParams(window.location.search).get("station") || "default";
+
+// (Re)join the station room on every connect; the server replies with the full
+// current state, later updates only carry the fields that changed
+socket.on("connect", () => {
+    socket.emit("join", { station: station });
+});
+
+// Render straight away from the stored state instead of waiting for the next
+// sensor reading and forecast to arrive over the socket
+fetch(`/api/snapshot?station=${encodeURIComponent(station)}`)
+    .then(response => response.json())
+    .then(snapshot => {
+        // Socket updates may already have arrived: they are newer, keep them
+        if (snapshot.latest) {
+            currentReading = { ...snapshot.latest, ...(currentReading || {}) };
+        }
+        if (snapshot.forecast && !forecastData) {
+            forecastData = snapshot.forecast;
+        }
+        if (snapshot.safety && !safetyLevel) {
+            safetyLevel = snapshot.safety;
+        }
+        recentHistory = snapshot.history || [];
+        renderSafety();
+    })
+    .catch(error => console.error("Error loading snapshot:", error));
+
 // Global variables to hold current sensor and forecast data
 let currentReading = null;
 let forecastData = null;
+let safetyLevel = null;
+// Recent 10-minute averages from the initial snapshot, shown before "Now" in the charts
+let recentHistory = [];
 
-// Listen for sensor updates and update currentReading and the overall safety indicator
+// Listen for sensor updates and update currentReading.
+// The edge only sends fields that changed, so merge each update into the last reading.
 socket.on("sensor_update", (data) => {
     console.log("Sensor update received:", data);
-    currentReading = data;
-    updateSafetyFusion();
+    currentReading = { ...(currentReading || {}), ...data };
 });
 
-// Listen for forecast updates and update forecastData and the overall safety indicator
+// Listen for forecast updates and update forecastData
 socket.on("forecast_update", (data) => {
     console.log("Forecast update received:", data);
     forecastData = data;
-    updateSafetyFusion();
 });
 
+// The server recomputes the safety level whenever the reading or forecast
+// changes it, and sends it here
+socket.on("safety_update", (data) => {
+    console.log("Safety update received:", data);
+    safetyLevel = data;
+    renderSafety();
+});
+
+// Forecasts arrive in column form: {base_timestamp, step_seconds, steps: [...],
+// <feature>: [...]}, where step n is n * step_seconds after base_timestamp.
+// Expands them into one object per forecast step (older row-form forecasts
+// with a "predictions" list are passed through).
+function forecastRows(forecast) {
+    if (!forecast) {
+        return [];
+    }
+    if (forecast.predictions) {
+        return forecast.predictions;
+    }
+    const base = new Date(forecast.base_timestamp).getTime();
+    return forecast.steps.map((step, i) => ({
+        step: step,
+        timestamp: new Date(base + step * forecast.step_seconds * 1000).toISOString(),
+        air_pressure: forecast.air_pressure[i],
+        temperature: forecast.temperature[i],
+        humidity: forecast.humidity[i],
+        wind_speed: forecast.wind_speed[i]
+    }));
+}
+
 // Initialize Leaflet map centered on the new coordinates for Singapore
 const map = L.map('map').setView([1.4137857851172828, 103.91225886502723], 12);
 L.tileLayer('https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png', {
@@ -29,142 +90,14 @@ L.tileLayer('https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png', {
 const marker = L.marker([1.4137857851172828, 103.91225886502723]).addTo(map);
 marker.bindPopup("Click here for detailed sensor data");
 
-function updateSafetyFusion() {
-    // Ensure we have both current and forecast data with at least one prediction
-    if (!currentReading || !forecastData || forecastData.predictions.length === 0) {
+// Shows the overall safety level computed by the server (safety.py), which
+// scores the 1 h to 4 h forecast steps against the current reading
+function renderSafety() {
+    if (!safetyLevel) {
         return;
     }
-    
-    // Use only the next 4 forecast predictions (or fewer if not available)
-    const forecasts = forecastData.predictions.slice(0, 4);
-    let maxOverallRiskValue = 0;
-    
-    // Calculate overall trends between current reading and the last forecast:
-    // --- Pressure Trend ---
-    const initialPressure = currentReading.air_pressure;
-    const finalPressure = forecasts[forecasts.length - 1].air_pressure;
-    const pressureDrop = initialPressure - finalPressure;
-    let pressureTrendRisk = 0;
-    if (pressureDrop >= 5) {
-        pressureTrendRisk = 2;
-    } else if (pressureDrop >= 3) {
-        pressureTrendRisk = 1;
-    }
-    
-    // --- Humidity Trend ---
-    const initialHumidity = currentReading.humidity;
-    const finalHumidity = forecasts[forecasts.length - 1].humidity;
-    const humidityIncrease = finalHumidity - initialHumidity;
-    let humidityTrendRisk = 0;
-    if (humidityIncrease >= 20) {
-        humidityTrendRisk = 2;
-    } else if (humidityIncrease >= 10) {
-        humidityTrendRisk = 1;
-    }
-    
-    forecasts.forEach(forecastReading => {
-        // --- Wind Speed (convert m/s to km/h) ---
-        const currentWindKmh = currentReading.wind_speed * 3.6;
-        const forecastWindKmh = forecastReading.wind_speed * 3.6;
-        
-        // Relative risk for wind speed (change from current reading)
-        let windRelativeRisk = 0;
-        const windDiff = forecastWindKmh - currentWindKmh;
-        if (windDiff >= 10) {
-            windRelativeRisk = 2;
-        } else if (windDiff >= 5) {
-            windRelativeRisk = 1;
-        }
-        // Absolute risk for wind speed (using thresholds suitable for Singapore)
-        let windAbsoluteRisk = 0;
-        if (forecastWindKmh >= 50) { // unusually strong winds
-            windAbsoluteRisk = 2;
-        } else if (forecastWindKmh >= 40) {
-            windAbsoluteRisk = 1;
-        }
-        const windRisk = Math.max(windRelativeRisk, windAbsoluteRisk);
-        
-        // --- Air Pressure ---
-        let pressureRelativeRisk = 0;
-        const pressureDiff = forecastReading.air_pressure - currentReading.air_pressure;
-        if (pressureDiff <= -5) {
-            pressureRelativeRisk = 2;
-        } else if (pressureDiff <= -3) {
-            pressureRelativeRisk = 1;
-        }
-        let pressureAbsoluteRisk = 0;
-        if (forecastReading.air_pressure < 1005) {
-            pressureAbsoluteRisk = 2;
-        } else if (forecastReading.air_pressure < 1010) {
-            pressureAbsoluteRisk = 1;
-        }
-        // Combine the per-forecast risk with the trend risk
-        const pressureRisk = Math.max(pressureRelativeRisk, pressureAbsoluteRisk, pressureTrendRisk);
-        
-        // --- Humidity ---
-        let humidityRisk = 0;
-        if (forecastReading.humidity >= 90) {
-            humidityRisk = 2;
-        } else if (forecastReading.humidity >= 80) {
-            humidityRisk = 1;
-        }
-        // Combine with the trend risk
-        const totalHumidityRisk = Math.max(humidityRisk, humidityTrendRisk);
-        
-        // --- Temperature ---
-        let temperatureRisk = 0;
-        // If the current temperature is already very high, skip further checks
-        if (currentReading.temperature >= 35) {
-            temperatureRisk = 2;
-        } else {
-            // Relative change check
-            const tempDiff = Math.abs(forecastReading.temperature - currentReading.temperature);
-            if (tempDiff >= 5) {
-                temperatureRisk = 2;
-            } else if (tempDiff >= 3) {
-                temperatureRisk = 1;
-            }
-            // Absolute temperature thresholds for dangerous conditions in Singapore
-            if (forecastReading.temperature >= 35) {
-                temperatureRisk = Math.max(temperatureRisk, 2);
-            } else if (forecastReading.temperature >= 33) {
-                temperatureRisk = Math.max(temperatureRisk, 1);
-            }
-        }
-        
-        // --- Rain Formation Risk ---
-        // Using meteorological principles:
-        // - Warmer temperatures increase air's moisture capacity.
-        // - A drop in pressure indicates approaching storm systems.
-        // - High humidity near saturation signals condensation potential.
-        let rainRisk = 0;
-        if (
-            forecastReading.temperature >= 33 && 
-            forecastReading.humidity >= 80 && 
-            forecastReading.air_pressure < 1010
-        ) {
-            rainRisk = 2;
-        } else if (
-            forecastReading.temperature >= 32 &&
-            forecastReading.humidity >= 75 &&
-            forecastReading.air_pressure < 1012
-        ) {
-            rainRisk = 1;
-        }
-        
-        // Determine overall risk for this forecast reading by taking the maximum risk value
-        const forecastRiskValue = Math.max(windRisk, pressureRisk, totalHumidityRisk, temperatureRisk, rainRisk);
-        maxOverallRiskValue = Math.max(maxOverallRiskValue, forecastRiskValue);
-    });
-    
-    // Map the maximum risk value to a label
-    let overallRisk = "SAFE";
-    if (maxOverallRiskValue === 2) {
-        overallRisk = "AVOID";
-    } else if (maxOverallRiskValue === 1) {
-        overallRisk = "CAUTION";
-    }
-    
+    const overallRisk = safetyLevel.level;
+
     // Remove previous overall safety marker if it exists
     if (window.overallSafetyMarker) {
         map.removeLayer(window.overallSafetyMarker);
@@ -187,19 +120,23 @@ function updateSafetyFusion() {
 
 // Function to create charts using Chart.js
 function createCharts() {
-    if (!currentReading || !forecastData || forecastData.predictions.length === 0) {
+    // Chart every published forecast step (10-minute resolution by default)
+    const forecastPredictions = forecastRows(forecastData);
+    if (!currentReading || forecastPredictions.length === 0) {
         alert("Sensor or forecast data not available yet.");
         return;
     }
-    
-    // Use only the next 4 forecast predictions for charting
-    const forecastPredictions = forecastData.predictions.slice(0, 4);
 
-    // Define labels: "Now" and then the times from forecast predictions
-    const labels = ["Now", ...forecastPredictions.map(pred => {
-        const date = new Date(pred.timestamp);
+    // Define labels: recent history, "Now" and then the times from forecast predictions
+    const timeLabel = (timestamp) => {
+        const date = new Date(timestamp);
         return date.toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' });
-    })];
+    };
+    const labels = [
+        ...recentHistory.map(bucket => timeLabel(bucket.timestamp)),
+        "Now",
+        ...forecastPredictions.map(pred => timeLabel(pred.timestamp))
+    ];
 
     // Define metrics to chart: current reading plus forecast values
     const metrics = {
@@ -245,7 +182,11 @@ function createCharts() {
                 labels: labels,
                 datasets: [{
                     label: metric.label,
-                    data: [metric.current, ...metric.forecast],
+                    data: [
+                        ...recentHistory.map(bucket => bucket[key] ? bucket[key].mean : null),
+                        metric.current,
+                        ...metric.forecast
+                    ],
                     fill: false,
                     borderColor: 'blue',
                     tension: 0.1
@@ -0,0 +1,123 @@
+"""
+Parity check of safety.assess() against the dashboard's original rule engine
+(updateSafetyFusion() in dashboard.js before the rules moved to the server),
+transliterated below one forecast row at a time.
+
+    python3 -m pytest Web_Dashboard/test_safety.py
+"""
+import math
+import random
+
+import pytest
+
+import safety
+
+#############################
+# Original Rules
+#############################
+
+def _get(reading, key):
+    # Missing values compare like JavaScript's undefined: every comparison is False
+    value = reading.get(key)
+    return math.nan if value is None else value
+
+def reference_level(current, rows):
+    # Row-form forecasts have no "step": none of their rows counts as hourly
+    hourly = [row for row in rows if "step" in row and row["step"] % 6 == 0]
+    forecasts = (hourly if hourly else rows)[:4]
+    max_risk = 0
+
+    pressure_drop = _get(current, "air_pressure") - forecasts[-1]["air_pressure"]
+    pressure_trend = 2 if pressure_drop >= 5 else 1 if pressure_drop >= 3 else 0
+    humidity_increase = forecasts[-1]["humidity"] - _get(current, "humidity")
+    humidity_trend = 2 if humidity_increase >= 20 else 1 if humidity_increase >= 10 else 0
+
+    for row in forecasts:
+        current_wind = _get(current, "wind_speed") * 3.6
+        forecast_wind = row["wind_speed"] * 3.6
+        wind_diff = forecast_wind - current_wind
+        wind_relative = 2 if wind_diff >= 10 else 1 if wind_diff >= 5 else 0
+        wind_absolute = 2 if forecast_wind >= 50 else 1 if forecast_wind >= 40 else 0
+        wind = max(wind_relative, wind_absolute)
+
+        pressure_diff = row["air_pressure"] - _get(current, "air_pressure")
+        pressure_relative = 2 if pressure_diff <= -5 else 1 if pressure_diff <= -3 else 0
+        pressure_absolute = 2 if row["air_pressure"] < 1005 else 1 if row["air_pressure"] < 1010 else 0
+        pressure = max(pressure_relative, pressure_absolute, pressure_trend)
+
+        humidity = 2 if row["humidity"] >= 90 else 1 if row["humidity"] >= 80 else 0
+        humidity = max(humidity, humidity_trend)
+
+        if _get(current, "temperature") >= 35:
+            temperature = 2
+        else:
+            temp_diff = abs(row["temperature"] - _get(current, "temperature"))
+            temperature = 2 if temp_diff >= 5 else 1 if temp_diff >= 3 else 0
+            if row["temperature"] >= 35:
+                temperature = max(temperature, 2)
+            elif row["temperature"] >= 33:
+                temperature = max(temperature, 1)
+
+        rain = 0
+        if row["temperature"] >= 33 and row["humidity"] >= 80 and row["air_pressure"] < 1010:
+            rain = 2
+        elif row["temperature"] >= 32 and row["humidity"] >= 75 and row["air_pressure"] < 1012:
+            rain = 1
+
+        max_risk = max(max_risk, wind, pressure, humidity, temperature, rain)
+    return safety.LEVELS[max_risk]
+
+#############################
+# Random Cases
+#############################
+
+# Ranges straddle every threshold of the rules
+RANGES = {
+    "air_pressure": (1000.0, 1016.0),
+    "temperature": (27.0, 37.0),
+    "humidity": (60.0, 95.0),
+    "wind_speed": (0.0, 16.0),
+}
+
+def random_reading(rng, drop=0.0):
+    reading = {}
+    for feature, (low, high) in RANGES.items():
+        if rng.random() >= drop:
+            # Coarse values hit the thresholds exactly now and then
+            reading[feature] = round(rng.uniform(low, high), rng.choice([0, 1, 2]))
+    return reading
+
+def random_case(rng):
+    current = random_reading(rng, drop=0.1)
+    steps = sorted(rng.sample(range(1, 25), rng.randint(1, 8)))
+    rows = [{"step": step, **random_reading(rng)} for step in steps]
+    if rng.random() < 0.2:
+        # Older row-form forecast, passed to the rules as is
+        rows = [{f: row[f] for f in RANGES} for row in rows]
+        forecast = {"base_timestamp": "2025-03-01T10:00:00", "predictions": rows}
+    else:
+        forecast = {"base_timestamp": "2025-03-01T10:00:00", "step_seconds": 600, "steps": steps,
+                    **{f: [row[f] for row in rows] for f in RANGES}}
+    return current, rows, forecast
+
+@pytest.mark.parametrize("seed", range(6))
+def test_assess_matches_original_rules(seed):
+    rng = random.Random(seed)
+    levels = set()
+    for _ in range(500):
+        current, rows, forecast = random_case(rng)
+        expected = reference_level(current, rows)
+        result = safety.assess(current, forecast)
+        assert result["level"] == expected, (current, forecast)
+        assert result["risk"] == safety.LEVELS.index(expected)
+        levels.add(expected)
+    assert levels == set(safety.LEVELS)
+
+def test_scored_steps_are_hourly():
+    forecast = {"steps": list(range(1, 37)),
+                **{f: [sum(RANGES[f]) / 2] * 36 for f in RANGES}}
+    steps, _ = safety.forecast_steps(forecast)
+    assert steps == [6, 12, 18, 24]
+
+def test_empty_forecast_has_no_level():
+    assert safety.assess({}, {"steps": [], **{f: [] for f in RANGES}}) is None
@@ -0,0 +1,79 @@
+import logging
+import os
+import threading
+import time
+
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest, start_http_server
+
+#############################
+# Metrics and Logging
+#############################
+# Each process defines its own prometheus_client metrics next to the code they
+# measure and exposes them on /metrics: app.py through a Flask route, the edge
+# and forecast nodes through serve() on their own METRICS_PORT.
+#
+# Logging replaces per-message prints: LOG_LEVEL selects the level (DEBUG shows
+# per-reading and per-forecast detail) and every distinct message is printed
+# at most once per LOG_RATE_LIMIT_SECONDS, with a count of the repeats dropped.
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_RATE_LIMIT_SECONDS = float(os.getenv("LOG_RATE_LIMIT_SECONDS", 10))
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lets each (logger, level, message template) through at most once every
+    `interval` seconds. Call sites pass values as logging arguments
+    (log.info("Stored %d readings", n)), so repeats share one template.
+    Records logged with extra={"rate_limit": False} always pass.
+    """
+
+    def __init__(self, interval=LOG_RATE_LIMIT_SECONDS):
+        super().__init__()
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.last = {}   # key -> (last emitted at, suppressed since)
+
+    def filter(self, record):
+        if self.interval <= 0 or not getattr(record, "rate_limit", True):
+            return True
+        key = (record.name, record.levelno, str(record.msg))
+        now = time.monotonic()
+        with self.lock:
+            emitted_at, suppressed = self.last.get(key, (None, 0))
+            if emitted_at is not None and now - emitted_at < self.interval:
+                self.last[key] = (emitted_at, suppressed + 1)
+                return False
+            self.last[key] = (now, 0)
+        if suppressed:
+            record.msg = f"{record.msg} [{suppressed} similar suppressed]"
+        return True
+
+def configure_logging(level=LOG_LEVEL, interval=LOG_RATE_LIMIT_SECONDS):
+    """
+    Sets up the root logger of a process once; modules log through
+    logging.getLogger(__name__).
+    """
+    root = logging.getLogger()
+    if any(isinstance(f, RateLimitFilter) for h in root.handlers for f in h.filters):
+        return
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    handler.addFilter(RateLimitFilter(interval))
+    root.addHandler(handler)
+    root.setLevel(level)
+
+def serve(port):
+    """
+    Exposes /metrics on `port` from a background thread, for processes without
+    a web server of their own. A port of 0 disables it.
+    """
+    if port:
+        start_http_server(port)
+        logging.getLogger(__name__).info("Serving metrics on :%d/metrics", port)
+
+def exposition():
+    """
+    Returns (body, content type) of the current metrics, for a web framework route.
+    """
+    return generate_latest(), CONTENT_TYPE_LATEST
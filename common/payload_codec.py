@@ -0,0 +1,211 @@
+import datetime
+import json
+import math
+import struct
+import time
+
+#############################
+# Sensor Payload Formats
+#############################
+# Every consumer of sensor/... topics calls decode(), which accepts:
+#   - a single JSON reading:  {"temperature": ..., ...}           (legacy)
+#   - a JSON batch:           {"v": 1, "readings": [{...}, ...]}
+#   - a binary batch:         MAGIC, version, then packed records (below)
+#
+# Binary batch, version 3 (little endian):
+#   header  <BBHd    magic, version, record count, timestamp of the first record (epoch s)
+#   station <B       length of the UTF-8 "station" id shared by the batch (0: none), then the id
+#   record  <I4f4fB  ms since the previous record, FIELDS values, FIELDS staleness (s),
+#                    2-bit quality code per field (FIELDS[0] in the lowest bits)
+# Missing values (None) are encoded as NaN. Quality codes follow QUALITY_CODES;
+# QUALITY_ABSENT marks a field left out of the reading (edge deadband reporting).
+# Versions 1 (no quality byte) and 2 (no station) are still decoded.
+
+FIELDS = ("temperature", "wind_speed", "air_pressure", "humidity")
+
+QUALITY_CODES = ("ok", "held", "missing")
+QUALITY_ABSENT = 3
+
+MAGIC = 0xB7
+VERSION = 3
+JSON_BATCH_VERSION = 1
+
+_HEADER = struct.Struct("<BBHd")
+_RECORDS = {
+    1: struct.Struct("<I%df%df" % (len(FIELDS), len(FIELDS))),
+    2: struct.Struct("<I%df%dfB" % (len(FIELDS), len(FIELDS))),
+}
+_RECORDS[3] = _RECORDS[2]
+_STATION_LENGTH = struct.Struct("<B")
+MAX_BATCH = 0xFFFF
+
+def _to_epoch(timestamp):
+    if timestamp is None:
+        return time.time()
+    if isinstance(timestamp, (int, float)):
+        return float(timestamp)
+    return datetime.datetime.fromisoformat(timestamp).timestamp()
+
+def _pack_value(value):
+    return math.nan if value is None else float(value)
+
+def _unpack_value(value, digits):
+    return None if math.isnan(value) else round(value, digits)
+
+def _pack_quality(reading):
+    quality = reading.get("quality") or {}
+    bits = 0
+    for i, field in enumerate(FIELDS):
+        if field not in reading:
+            code = QUALITY_ABSENT
+        elif quality.get(field) in QUALITY_CODES:
+            code = QUALITY_CODES.index(quality[field])
+        else:
+            code = 0
+        bits |= code << (2 * i)
+    return bits
+
+def encode_binary(readings):
+    """
+    Packs a list of readings (dicts with "timestamp" and some of FIELDS, plus
+    optional "staleness" and "quality" dicts and "station") into one binary
+    batch. Timestamps are delta-encoded in ms. All readings of a batch must
+    name the same station (or none).
+    """
+    if not readings or len(readings) > MAX_BATCH:
+        raise ValueError(f"batch must hold 1 to {MAX_BATCH} readings")
+    stations = {reading.get("station") for reading in readings}
+    if len(stations) > 1:
+        raise ValueError(f"readings of one binary batch name different stations: {sorted(map(str, stations))}")
+    station = stations.pop()
+    station = b"" if station is None else str(station).encode("utf-8")
+    if len(station) > 0xFF:
+        raise ValueError("station id longer than 255 bytes")
+    timestamps = [_to_epoch(reading.get("timestamp")) for reading in readings]
+    parts = [_HEADER.pack(MAGIC, VERSION, len(readings), timestamps[0]),
+             _STATION_LENGTH.pack(len(station)), station]
+    previous_ms = round(timestamps[0] * 1000)
+    for reading, timestamp in zip(readings, timestamps):
+        # Deltas are taken between rounded absolute times so errors do not accumulate
+        current_ms = round(timestamp * 1000)
+        staleness = reading.get("staleness") or {}
+        parts.append(_RECORDS[VERSION].pack(
+            max(current_ms - previous_ms, 0),
+            *[_pack_value(reading.get(field)) for field in FIELDS],
+            *[_pack_value(staleness.get(field)) for field in FIELDS],
+            _pack_quality(reading),
+        ))
+        previous_ms = max(current_ms, previous_ms)
+    return b"".join(parts)
+
+def _decode_binary(payload):
+    magic, version, count, base = _HEADER.unpack_from(payload, 0)
+    if version not in _RECORDS:
+        raise ValueError(f"unsupported binary batch version {version}")
+    record_format = _RECORDS[version]
+    readings = []
+    offset = _HEADER.size
+    station = None
+    if version >= 3:
+        (length,) = _STATION_LENGTH.unpack_from(payload, offset)
+        offset += _STATION_LENGTH.size
+        if len(payload) < offset + length:
+            raise struct.error("station id cut short")
+        station = payload[offset:offset + length].decode("utf-8") or None
+        offset += length
+    current_ms = round(base * 1000)
+    for _ in range(count):
+        record = record_format.unpack_from(payload, offset)
+        offset += record_format.size
+        current_ms += record[0]
+        values = record[1:1 + len(FIELDS)]
+        staleness = record[1 + len(FIELDS):1 + 2 * len(FIELDS)]
+        bits = record[-1] if version >= 2 else 0
+        codes = [(bits >> (2 * i)) & 0x3 for i in range(len(FIELDS))]
+
+        reading = {"timestamp": datetime.datetime.fromtimestamp(current_ms / 1000).isoformat()}
+        if station is not None:
+            reading["station"] = station
+        for field, value, code in zip(FIELDS, values, codes):
+            if code != QUALITY_ABSENT:
+                reading[field] = _unpack_value(value, 2)
+        reading["staleness"] = {
+            field: _unpack_value(value, 2)
+            for field, value, code in zip(FIELDS, staleness, codes) if code != QUALITY_ABSENT
+        }
+        if version >= 2:
+            reading["quality"] = {
+                field: QUALITY_CODES[code] for field, code in zip(FIELDS, codes) if code != QUALITY_ABSENT
+            }
+        readings.append(reading)
+    return readings
+
+def encode_json(readings):
+    """
+    One reading is sent as the legacy plain JSON object, several as a JSON batch.
+    """
+    if len(readings) == 1:
+        return json.dumps(readings[0])
+    return json.dumps({"v": JSON_BATCH_VERSION, "readings": readings})
+
+def encode(readings, encoding="json"):
+    if encoding == "binary":
+        return encode_binary(readings)
+    return encode_json(readings)
+
+def decode(payload):
+    """
+    Returns the list of readings carried by a sensor payload (bytes or str),
+    whatever format it was published in. Raises ValueError on a malformed payload.
+    """
+    if isinstance(payload, (bytes, bytearray)) and payload[:1] == bytes([MAGIC]):
+        try:
+            return _decode_binary(payload)
+        except struct.error as e:
+            raise ValueError(f"truncated binary batch: {e}")
+    if isinstance(payload, (bytes, bytearray)):
+        payload = payload.decode("utf-8")
+    data = json.loads(payload)
+    readings = [data]
+    if isinstance(data, dict) and "readings" in data:
+        if data.get("v") != JSON_BATCH_VERSION:
+            raise ValueError(f"unsupported JSON batch version {data.get('v')}")
+        readings = data["readings"]
+        if not isinstance(readings, list):
+            raise ValueError("JSON batch readings must be a list")
+    for reading in readings:
+        if not isinstance(reading, dict):
+            raise ValueError(f"reading must be a JSON object, got {type(reading).__name__}")
+    return readings
+
+class Batcher:
+    """
+    Collects readings and hands them to `send(payload, readings)` as one encoded
+    message once `max_readings` are buffered or the oldest is `max_seconds` old.
+    With max_readings=1 every reading is sent on its own as plain JSON.
+    """
+
+    def __init__(self, send, max_readings=1, max_seconds=30.0, encoding="json"):
+        self.send = send
+        self.max_readings = max(1, min(max_readings, MAX_BATCH))
+        self.max_seconds = max_seconds
+        self.encoding = encoding
+        self.readings = []
+        self.first_added = None
+
+    def add(self, reading):
+        # A binary batch carries one station
+        if self.readings and reading.get("station") != self.readings[-1].get("station"):
+            self.flush()
+        if not self.readings:
+            self.first_added = time.monotonic()
+        self.readings.append(reading)
+        if (len(self.readings) >= self.max_readings
+                or time.monotonic() - self.first_added >= self.max_seconds):
+            self.flush()
+
+    def flush(self):
+        if not self.readings:
+            return
+        readings, self.readings = self.readings, []
+        self.send(encode(readings, self.encoding), readings)
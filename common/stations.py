@@ -0,0 +1,47 @@
+#############################
+# Station-aware MQTT Topics
+#############################
+# Readings and forecasts of the original single station use the legacy topics;
+# other stations publish on per-station topics (or name the station in the
+# payload's "station" field on the legacy topic).
+
+DEFAULT_STATION = "default"
+
+SENSOR_TOPIC = "sensor/data"
+SENSOR_STATION_TOPICS = "sensor/+/data"
+SENSOR_STATION_TOPIC = "sensor/{station}/data"
+FORECAST_TOPIC = "forecast/predictions"
+FORECAST_STATION_TOPICS = "forecast/+/predictions"
+FORECAST_STATION_TOPIC = "forecast/{station}/predictions"
+# Running forecast accuracy published by the forecast node (retained)
+EVALUATION_TOPIC = "forecast/evaluation"
+
+def _matches(topic, prefix, suffix):
+    parts = topic.split("/")
+    return parts[0] == prefix and parts[-1] == suffix and len(parts) in (2, 3)
+
+def is_sensor_topic(topic):
+    return _matches(topic, "sensor", "data")
+
+def is_forecast_topic(topic):
+    return _matches(topic, "forecast", "predictions")
+
+def station_from_message(topic, data):
+    """
+    Station id from a "<kind>/<station>/<name>" topic, or from the payload's
+    "station" field on a legacy two-level topic.
+    """
+    parts = topic.split("/")
+    if len(parts) == 3:
+        return parts[1]
+    return str(data.get("station", DEFAULT_STATION))
+
+def sensor_topic(station_id):
+    if station_id == DEFAULT_STATION:
+        return SENSOR_TOPIC
+    return SENSOR_STATION_TOPIC.format(station=station_id)
+
+def forecast_topic(station_id):
+    if station_id == DEFAULT_STATION:
+        return FORECAST_TOPIC
+    return FORECAST_STATION_TOPIC.format(station=station_id)